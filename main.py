@@ -1,5 +1,6 @@
 import argparse
 import asyncio
+import json
 import logging
 import os
 import sys
@@ -12,6 +13,10 @@ from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
 from bank_agent import agent
+from tools.bulk_ingest import DEFAULT_CONCURRENCY, ingest
+from tools.page_repair import repair_statement
+from tools.reparse import reparse
+from tools.response_archive import DEFAULT_ARCHIVE_DIR
 
 # ── 1) Load .env and configure logging ───────────────────────────────
 load_dotenv(override=True)
@@ -87,7 +92,80 @@ async def call_agent_async(pdf_path: Path, question: str) -> None:
     logger.info(f"Agent final response: {final}")
 
 # ── 4) CLI entrypoint ────────────────────────────────────────────────
+def bulk_main(argv):
+    ap = argparse.ArgumentParser(prog="main.py bulk", description="Extract transactions from many statement PDFs")
+    ap.add_argument("source", help="Directory (searched recursively) or glob pattern, e.g. 'statements/**/*.pdf'")
+    ap.add_argument("-o", "--output", type=Path, default=Path("bulk_output"), help="Directory for per-file JSON and summary.json")
+    ap.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Max statements processed at once")
+    args = ap.parse_args(argv)
+
+    summary = ingest(args.source, str(args.output), args.concurrency)
+    if summary["files"] == 0:
+        print(f"Error: no PDF files matched {args.source}", file=sys.stderr)
+        sys.exit(1)
+
+    latency = summary["latency_seconds"]
+    print(f"Processed {summary['files']} PDFs in {summary['wall_seconds']}s "
+          f"({summary['files_per_second']} files/s): {summary['succeeded']} succeeded, {summary['failed']} failed, "
+          f"{summary['transactions']} transactions.")
+    print(f"Latency p50={latency['p50']}s p90={latency['p90']}s p99={latency['p99']}s max={latency['max']}s")
+    for failure in summary["failures"]:
+        print(f"  FAILED {failure['file']}: {failure['error']}", file=sys.stderr)
+    print(f"Results written to {args.output.resolve()}")
+
+
+def reparse_main(argv):
+    ap = argparse.ArgumentParser(prog="main.py reparse", description="Re-extract transactions from archived Document AI responses (no OCR)")
+    ap.add_argument("-a", "--archive", default=os.getenv("DOCAI_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR), help="Response archive directory")
+    ap.add_argument("-o", "--output", type=Path, default=Path("reparse_output"), help="Directory for per-statement JSON and summary.json")
+    ap.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = ap.parse_args(argv)
+
+    summary = reparse(args.archive, str(args.output), args.workers)
+    if summary["statements"] == 0:
+        print(f"Error: no archived responses in {args.archive}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Re-parsed {summary['statements']} statements in {summary['wall_seconds']}s "
+          f"({summary['statements_per_second']} statements/s, {summary['workers']} workers): "
+          f"{summary['succeeded']} succeeded, {summary['failed']} failed, {summary['transactions']} transactions.")
+    for failure in summary["failures"]:
+        print(f"  FAILED {failure['source']}: {failure['error']}", file=sys.stderr)
+    print(f"Results written to {args.output.resolve()}")
+
+
+def repair_main(argv):
+    ap = argparse.ArgumentParser(prog="main.py repair", description="Re-OCR only the unhealthy pages of a statement")
+    ap.add_argument("pdf", type=Path, help="PDF path")
+    ap.add_argument("-p", "--processor-id", default=None, help="Document AI processor for the retry (default: DOCUMENT_AI_REPAIR_PROCESSOR_ID, then DOCUMENT_AI_PROCESSOR_ID)")
+    ap.add_argument("--rasterize-dpi", type=int, default=None, help="Re-render the pages as grayscale images at this DPI before upload")
+    ap.add_argument("-o", "--output", type=Path, default=None, help="Write the repaired transactions to this JSON file")
+    args = ap.parse_args(argv)
+
+    if not args.pdf.is_file():
+        print(f"Error: PDF file not found at {args.pdf}", file=sys.stderr)
+        sys.exit(1)
+
+    result = repair_statement(str(args.pdf), args.processor_id, args.rasterize_dpi)
+    print(f"Unhealthy pages: {result['unhealthy'] or 'none'}; repaired: {result['repaired'] or 'none'}; "
+          f"still unhealthy: {result['still_unhealthy'] or 'none'}; {len(result['transactions'])} transactions.")
+    if args.output:
+        args.output.write_text(json.dumps([t.to_dict() for t in result["transactions"]], ensure_ascii=False, indent=2),
+                               encoding="utf-8")
+        print(f"Transactions written to {args.output.resolve()}")
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "bulk":
+        bulk_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "reparse":
+        reparse_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "repair":
+        repair_main(sys.argv[2:])
+        return
+
     ap = argparse.ArgumentParser(description="Bank statement ADK CLI")
     ap.add_argument("pdf", type=Path, help="PDF path")
     ap.add_argument("question", nargs="+", help="Query text")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""Microbenchmark: merchant_key throughput (one core) and how far it collapses noisy descriptions."""
+import random
+import sys
+import time
+from collections import deque
+
+from tools.merchant_normalizer import merchant_key
+
+MERCHANTS = ["TESCO STORES", "SAINSBURYS", "NETFLIX.COM", "AMAZON.CO.UK", "SQ *BLUE BOTTLE COFFEE", "PAYPAL *SPOTIFY",
+             "BRITISH GAS", "UBER *TRIP", "M&S SIMPLY FOOD", "7-ELEVEN", "SHELL", "TFL TRAVEL CHARGE", "PRET A MANGER",
+             "DELIVEROO", "VODAFONE", "THAMES WATER", "COSTA COFFEE", "BOOTS", "ARGOS", "GREGGS"]
+PREFIXES = ["", "POS ", "CARD PAYMENT TO ", "CONTACTLESS ", "DD ", "VISA "]
+CITIES = ["", " LONDON", " MANCHESTER", " LEEDS GB", " DUBLIN IE", " SEATTLE WA"]
+
+
+def synthetic_descriptions(count: int, seed: int = 7):
+    """Bank-style descriptions: merchant plus card/terminal numbers, dates and cities."""
+    rng = random.Random(seed)
+    return [f"{rng.choice(PREFIXES)}{rng.randint(1000, 9999)} {rng.choice(MERCHANTS)} {rng.randint(100, 99999)}"
+            f"{rng.choice(CITIES)} {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}" for _ in range(count)]
+
+
+def rate(func, values) -> float:
+    started = time.perf_counter()
+    deque(map(func, values), maxlen=0)
+    return len(values) / (time.perf_counter() - started)
+
+
+def main(count: int) -> None:
+    unique = synthetic_descriptions(count)
+    keys = {merchant_key.__wrapped__(d) for d in unique}
+    print(f"{count:,} synthetic descriptions ({len(set(unique)):,} distinct) -> {len(keys)} merchant keys "
+          f"(from {len(MERCHANTS)} merchants)")
+
+    cold = rate(merchant_key.__wrapped__, unique)
+    print(f"uncached (every description new)   {cold:>12,.0f} descriptions/s")
+
+    # Statements repeat merchants (and often whole descriptions) month after month
+    rng = random.Random(11)
+    history = [rng.choice(unique[:count // 10]) for _ in range(count)]
+    merchant_key.cache_clear()
+    warm = rate(merchant_key, history)
+    print(f"memoized, 10% distinct             {warm:>12,.0f} descriptions/s  {merchant_key.cache_info()}")
+    print(f"target 1,000,000/s per core: uncached {'met' if cold >= 1e6 else 'not met'}, "
+          f"memoized {'met' if warm >= 1e6 else 'not met'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""Benchmark: proto-plus table walk vs the raw protobuf walker in extract_transactions."""
+import logging
+import sys
+import time
+import tracemalloc
+
+from bench_text_extraction import build_document
+from tools.bank_statement_tool import extract_transactions, get_text, is_transaction_table
+
+HEADERS = ["Date", "Description", "Debit", "Credit", "Balance"]
+
+
+def extract_transactions_proto_plus(document):
+    """The previous walker: proto-plus attribute access and get_text per cell."""
+    transactions = []
+    for page in document.pages:
+        for table in page.tables:
+            if not table.header_rows:
+                continue
+            headers = [get_text(document, cell.layout) for cell in table.header_rows[0].cells]
+            if not is_transaction_table(headers):
+                continue
+            header_keys = [h.lower().strip() for h in headers]
+            for body_row in table.body_rows:
+                row_values = [get_text(document, cell.layout) for cell in body_row.cells]
+                if len(row_values) >= len(header_keys):
+                    transactions.append(dict(zip(header_keys, row_values)))
+    return transactions
+
+
+def measure(func, document):
+    """Returns (result, cpu seconds, peak traced bytes) for one run."""
+    tracemalloc.start()
+    started = time.process_time()
+    result = func(document)
+    cpu = time.process_time() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, cpu, peak
+
+
+def main(pages: int) -> None:
+    logging.disable(logging.INFO)  # Keep per-table log lines out of the timings
+    document = build_document(pages=pages, headers=HEADERS)
+    print(f"Synthetic document: {pages} pages, {pages * 50} transaction rows")
+
+    baseline, base_cpu, base_peak = measure(extract_transactions_proto_plus, document)
+    fast, fast_cpu, fast_peak = measure(extract_transactions, document)
+    assert [row["description"] for row in baseline] == [t.description for t in fast], "Outputs differ!"
+
+    print(f"{'proto-plus walker':<20} cpu {base_cpu * 1000:8.1f} ms   peak alloc {base_peak / 1024:8.1f} KiB")
+    print(f"{'raw protobuf walker':<20} cpu {fast_cpu * 1000:8.1f} ms   peak alloc {fast_peak / 1024:8.1f} KiB")
+    print(f"Speedup x{base_cpu / fast_cpu:.1f}, peak allocation x{base_peak / fast_peak:.1f} lower")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
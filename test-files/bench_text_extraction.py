@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""Microbenchmark: get_text vs DocumentText.cells_text on a synthetic Document."""
+import random
+import sys
+import timeit
+
+from google.cloud import documentai_v1 as documentai
+from tools.bank_statement_tool import DocumentText, get_text
+
+Table = documentai.Document.Page.Table
+
+
+def build_document(pages: int = 20, rows_per_table: int = 50, columns: int = 5, headers=None) -> documentai.Document:
+    """Builds a Document whose table cells point into one shared text buffer."""
+    rng = random.Random(42)
+    columns = len(headers) if headers else columns
+    chunks = []
+    offset = 0
+
+    def cell(value: str = None, column: int = 1) -> Table.TableCell:
+        nonlocal offset
+        if value is None and column == 0:
+            value = f"{rng.randint(1, 28):02d} Jan"
+        elif value is None and column == 1:
+            value = f"POS {rng.randint(1000, 9999)} MERCHANT {rng.randint(1, 500)}\nLONDON"
+        elif value is None:
+            value = f"{rng.randint(0, 9999):,}.{rng.randint(0, 99):02d}"
+        chunks.append(value)
+        segment = documentai.Document.TextAnchor.TextSegment(start_index=offset, end_index=offset + len(value))
+        offset += len(value)
+        return Table.TableCell(layout=documentai.Document.Page.Layout(
+            text_anchor=documentai.Document.TextAnchor(text_segments=[segment])))
+
+    doc_pages = []
+    for _ in range(pages):
+        table = Table(
+            header_rows=[Table.TableRow(cells=[cell(h) for h in headers] if headers else [cell(column=c) for c in range(columns)])],
+            body_rows=[Table.TableRow(cells=[cell(column=c) for c in range(columns)]) for _ in range(rows_per_table)],
+        )
+        doc_pages.append(documentai.Document.Page(tables=[table]))
+    return documentai.Document(text="".join(chunks), pages=doc_pages)
+
+
+def run_get_text(document):
+    return [[get_text(document, cell.layout) for cell in row.cells]
+            for page in document.pages for table in page.tables for row in table.body_rows]
+
+
+def run_document_text(document):
+    doc_text = DocumentText(document)
+    return [doc_text.cells_text(row.cells)
+            for page in document.pages for table in page.tables for row in table.body_rows]
+
+
+def main(pages: int) -> None:
+    document = build_document(pages=pages)
+    cells = sum(len(row.cells) for page in document.pages for table in page.tables for row in table.body_rows)
+    print(f"Synthetic document: {pages} pages, {cells} body cells, {len(document.text)} chars")
+
+    assert run_get_text(document) == run_document_text(document), "Outputs differ!"
+
+    for label, func in (("get_text", run_get_text), ("DocumentText.cells_text", run_document_text)):
+        best = min(timeit.repeat(lambda: func(document), number=1, repeat=5))
+        print(f"{label:<26} {best * 1000:8.1f} ms  ({cells / best:,.0f} cells/s)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Evaluates scanned-page re-encoding on a fixture set: upload size reduction per
+target DPI and, with --ocr, the OCR accuracy delta (transactions extracted
+from the re-encoded PDF that match the ones from the original).
+
+    python test-files/eval_scan_downsampling.py fixtures/ --dpi 150 200 300 --ocr
+
+Without fixtures, a synthetic 300 DPI colour scan is generated.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from tools.pdf_preflight import PreflightError, check_preflight, inspect_pdf
+from tools.scan_preprocess import downsample_scanned_pages
+
+
+def synthetic_scan(pages: int = 3, dpi: int = 300) -> bytes:
+    """A colour 'scan' of a statement: text on a slightly noisy, tinted background."""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = random.Random(7)
+    images = []
+    for page in range(pages):
+        image = Image.new("RGB", (int(8.5 * dpi), 11 * dpi), (246, 243, 235))
+        draw = ImageDraw.Draw(image)
+        for _ in range(4000):  # Paper grain
+            x, y = rng.randrange(image.width), rng.randrange(image.height)
+            draw.point((x, y), fill=(rng.randint(200, 240),) * 3)
+        y = dpi
+        draw.text((dpi, y), "Date    Description            Debit     Credit    Balance", fill=(20, 20, 60))
+        for row in range(40):
+            y += dpi // 6
+            draw.text((dpi, y), f"{row % 28 + 1:02d} Jan  POS MERCHANT {rng.randint(1, 999):<10} "
+                                f"{rng.randint(1, 500)}.{rng.randint(0, 99):02d}              "
+                                f"{rng.randint(1000, 9000)}.{rng.randint(0, 99):02d}", fill=(20, 20, 60))
+        images.append(image.filter(ImageFilter.GaussianBlur(0.6)))
+    buffer = io.BytesIO()
+    images[0].save(buffer, "PDF", resolution=dpi, quality=95, save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+def transaction_keys(pdf_bytes: bytes):
+    from tools.bank_statement_tool import extract_statement
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(pdf_bytes)
+    try:
+        return [(t.date, t.amount_cents, t.description) for t in extract_statement(tmp.name)]
+    finally:
+        os.unlink(tmp.name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("fixtures", nargs="?", help="Directory of (scanned) PDF statements")
+    parser.add_argument("--dpi", type=int, nargs="+", default=[150, 200, 300])
+    parser.add_argument("--quality", type=int, default=75)
+    parser.add_argument("--ocr", action="store_true", help="Also compare extracted transactions (calls OCR)")
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    # Compare OCR output on exactly the bytes given, not on a re-encoded copy
+    os.environ["DOCAI_UPLOAD_DPI"] = "0"
+    os.environ["STATEMENT_EXTRACTORS"] = "ocr"
+
+    if args.fixtures:
+        fixtures = {p.name: p.read_bytes() for p in sorted(Path(args.fixtures).glob("*.pdf"))}
+    else:
+        fixtures = {"synthetic-300dpi-colour.pdf": synthetic_scan()}
+    if not fixtures:
+        sys.exit(f"No PDFs found in {args.fixtures}")
+
+    totals = {dpi: [0, 0] for dpi in args.dpi}
+    for name, original in fixtures.items():
+        try:
+            check_preflight(inspect_pdf(original), name)
+        except PreflightError as e:
+            print(f"{name}: skipped ({e})")
+            continue
+        baseline = transaction_keys(original) if args.ocr else None
+        print(f"{name}: {len(original) / 1024:,.0f} KiB" + (f", {len(baseline)} transactions" if args.ocr else ""))
+        for dpi in args.dpi:
+            started = time.perf_counter()
+            reduced = downsample_scanned_pages(original, dpi, args.quality)
+            elapsed = time.perf_counter() - started
+            totals[dpi][0] += len(original)
+            totals[dpi][1] += len(reduced)
+            line = (f"  {dpi:>4} DPI  {len(reduced) / 1024:>9,.0f} KiB  "
+                    f"-{100 * (1 - len(reduced) / len(original)):4.1f}%  ({elapsed * 1000:.0f} ms)")
+            if args.ocr:
+                found = set(transaction_keys(reduced))
+                matched = sum(1 for key in baseline if key in found)
+                accuracy = matched / len(baseline) if baseline else 1.0
+                line += f"  matched {matched}/{len(baseline)}  accuracy delta {100 * (accuracy - 1):+.1f} pts"
+            print(line)
+
+    print("Total size reduction:")
+    for dpi, (before, after) in totals.items():
+        print(f"  {dpi:>4} DPI  -{100 * (1 - after / before):4.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""Unit-test for boilerplate page skipping: re-runs and continuation pages never lose transactions."""
+import io
+import os
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="boilerplate-test-")
+os.environ.update(
+    BANK_BOILERPLATE_REGISTRY=os.path.join(_TMP, "boilerplate.json"),
+    BANK_LAYOUT_REGISTRY=os.path.join(_TMP, "layouts.json"),
+    STATEMENT_EXTRACTORS="native",  # Offline: born-digital test PDFs only
+    BOILERPLATE_MIN_SIGHTINGS="2",
+)
+
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from tools.boilerplate_pages import BoilerplateRegistry
+from tools.bank_statement_tool import extract_statement
+
+HEADER = [(50, "Date"), (150, "Description"), (350, "Debit"), (420, "Credit"), (500, "Balance")]
+TERMS = [[(50, "Terms and conditions apply to all accounts held with Example Bank plc.")],
+         [(50, "Please contact us if anything on this statement looks wrong to you.")]]
+
+
+def row(day: int, description: str, debit: str) -> list:
+    return [(50, f"{day:02d}/01/2024"), (150, description), (350, debit), (420, "0.00"), (500, "1,000.00")]
+
+
+def build_pdf(pages) -> bytes:
+    """A born-digital PDF with one line of positioned text per entry."""
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"), NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")}))
+    for lines in pages:
+        ops, y = ["BT /F1 10 Tf"], 780
+        for line in lines:
+            ops += [f"1 0 0 1 {x} {y} Tm ({text}) Tj" for x, text in line]
+            y -= 16
+        stream = DecodedStreamObject()
+        stream.set_data("\n".join(ops + ["ET"]).encode())
+        page = writer.add_blank_page(612, 842)
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def statement(path: str, tag: str) -> str:
+    """Transactions, a headerless continuation page, more transactions, then terms."""
+    pages = [
+        [HEADER] + [row(day, f"{tag} SHOP {day}", f"{day}.00") for day in (1, 2, 3)],
+        [row(day, f"{tag} CONT {day}", f"{day}.00") for day in (4, 5, 6)],
+        [HEADER] + [row(day, f"{tag} STORE {day}", f"{day}.00") for day in (7, 8, 9)],
+        TERMS,
+    ]
+    with open(path, "wb") as f:
+        f.write(build_pdf(pages))
+    return path
+
+
+def test_rerunning_a_statement_never_skips_pages():
+    path = statement(os.path.join(_TMP, "rerun.pdf"), "RERUN")
+    for _ in range(3):
+        assert len(extract_statement(path)) == 9
+
+
+def test_terms_page_skipped_after_distinct_statements_only():
+    first = statement(os.path.join(_TMP, "january.pdf"), "JAN")
+    second = statement(os.path.join(_TMP, "february.pdf"), "FEB")
+    third = statement(os.path.join(_TMP, "march.pdf"), "MAR")
+    for path in (first, second, third):
+        assert len(extract_statement(path)) == 9
+    registry = BoilerplateRegistry(os.environ["BANK_BOILERPLATE_REGISTRY"])
+    assert registry.stats()["boilerplate_pages"] == 1  # The terms page only, never the continuation page
+
+
+def test_same_statement_counts_once():
+    registry = BoilerplateRegistry(os.path.join(_TMP, "unit.json"), min_sightings=2)
+    for _ in range(3):
+        registry.observe("layout", "statement-a", ["terms", "rows"], transaction_pages=[1], processed_pages=[0, 1])
+    assert registry.known_boilerplate(["terms", "rows"]) == []
+    registry.observe("layout", "statement-b", ["terms", "rows"], transaction_pages=[1], processed_pages=[0, 1])
+    assert registry.known_boilerplate(["terms", "rows"]) == [0]
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in globals().items() if name.startswith("test_")]
+    for name, func in tests:
+        func()
+        print(f"✅  {name}")
+    sys.exit(0)
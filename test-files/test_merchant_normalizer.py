@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+"""Unit-test for merchant_key: noise is dropped, merchant and money direction are kept."""
+import sys
+
+from tools.merchant_normalizer import merchant_key
+
+
+def test_noise_collapses_to_merchant():
+    assert merchant_key("POS 1234 TESCO STORES 2931 LONDON 12/03") == "tesco"
+    assert merchant_key("CARD PAYMENT TO NETFLIX.COM 4829") == "netflix"
+    assert merchant_key("SQ *BLUE BOTTLE COFFEE SEATTLE WA") == "blue bottle coffee"
+    assert merchant_key("VISA DEBIT CARD TESCO") == "tesco"
+
+
+def test_direction_words_are_kept():
+    pairs = [
+        ("TRANSFER IN", "TRANSFER TO 12345678"),
+        ("TFR IN 1234", "TFR TO 1234"),
+        ("INTEREST CR", "INTEREST DR"),
+        ("SALARY CREDIT", "SALARY DEBIT"),
+    ]
+    for money_in, money_out in pairs:
+        assert merchant_key(money_in) != merchant_key(money_out), (money_in, money_out)
+    assert merchant_key("TFR IN 1234") == "tfr in"
+    assert merchant_key("INTEREST DR") == "interest dr"
+    assert merchant_key("JOHN SMITH SALARY ACC TRANSFER IN").endswith(" in")
+
+
+def test_only_state_codes_are_stripped():
+    assert merchant_key("7-ELEVEN 1234 DALLAS TX") == "7-eleven"
+    assert merchant_key("ACME XY") == "acme xy"  # Not a state code
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in globals().items() if name.startswith("test_")]
+    for name, func in tests:
+        func()
+        print(f"✅  {name}")
+    sys.exit(0)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""Unit-test for amount normalization and signed transaction amounts."""
+import sys
+
+from tools.header_classifier import HeaderClassifier, HEADER_KEYWORDS
+from tools.normalization import build_transactions, normalize_amount_column
+
+
+def test_amount_formats():
+    assert normalize_amount_column(["1,234.56", "-45.00", "(12.50)", "£3.00", "", "n/a"]) == \
+        [123456, -4500, -1250, 300, None, None]
+    assert normalize_amount_column(["2,000.00 CR", "45.00 DR", "+5.00", "7.00-"]) == [200000, -4500, 500, -700]
+    assert normalize_amount_column(["1.234,56", "12,00", "3.500"]) == [123456, 1200, 350000]
+
+
+def test_combined_debit_credit_column_is_amount():
+    classifier = HeaderClassifier(HEADER_KEYWORDS["en"])
+    for header in ("Debit/Credit", "Withdrawals / Deposits", "Amount (Debit/Credit)", "Debit Credit"):
+        roles = classifier.classify(["Date", "Description", header, "Balance"])
+        assert roles.get("amount") == 2 and "debit" not in roles and "credit" not in roles, (header, roles)
+    split = classifier.classify(["Date", "Description", "Debit Amount", "Credit Amount", "Balance"])
+    assert split["debit"] == 2 and split["credit"] == 3, split
+
+
+def test_signed_amount_column_keeps_direction():
+    rows = [["01/01/2024", "SALARY", "2,000.00 CR", ""], ["02/01/2024", "SHOP", "45.00 DR", ""],
+            ["03/01/2024", "REFUND", "+5.00", ""]]
+    roles = {"date": 0, "description": 1, "amount": 2, "balance": 3}
+    records = build_transactions(rows, roles, page=1, row_numbers=[1, 2, 3])
+    assert [t.amount_cents for t in records] == [200000, -4500, 500]
+
+
+def test_unsigned_amount_column_signed_by_balance():
+    rows = [["01/01/2024", "OPENING", "100.00", "1,000.00"], ["02/01/2024", "SALARY", "2,000.00", "3,000.00"],
+            ["03/01/2024", "RENT", "1,200.00", "1,800.00"]]
+    roles = {"date": 0, "description": 1, "amount": 2, "balance": 3}
+    records = build_transactions(rows, roles, page=1, row_numbers=[1, 2, 3])
+    assert [t.amount_cents for t in records] == [10000, 200000, -120000]
+
+
+def test_split_columns_respect_explicit_signs():
+    rows = [["01/01/2024", "SHOP", "45.00", ""], ["02/01/2024", "SALARY", "", "2,000.00"],
+            ["03/01/2024", "REVERSAL", "10.00 CR", ""], ["04/01/2024", "FEE", "-3.00", ""]]
+    roles = {"date": 0, "description": 1, "debit": 2, "credit": 3}
+    records = build_transactions(rows, roles, page=1, row_numbers=[1, 2, 3, 4])
+    assert [t.amount_cents for t in records] == [-4500, 200000, 1000, -300]
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in globals().items() if name.startswith("test_")]
+    for name, func in tests:
+        func()
+        print(f"✅  {name}")
+    sys.exit(0)
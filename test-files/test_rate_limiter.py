@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""Unit-test for RateLimiter: pacing, back-off and calls larger than the token bucket."""
+import sys
+
+from google.api_core import exceptions as api_exceptions
+
+from tools import rate_limiter
+from tools.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    """Stands in for the time module: sleeping just advances the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += max(seconds, 1e-6)  # Like the real clock, a sleep always moves time on
+
+
+def with_fake_clock(test):
+    def run():
+        real_time, rate_limiter.time = rate_limiter.time, FakeClock()
+        try:
+            test(rate_limiter.time)
+        finally:
+            rate_limiter.time = real_time
+    run.__name__ = test.__name__
+    return run
+
+
+@with_fake_clock
+def test_requests_are_paced(clock):
+    limiter = RateLimiter("t", qpm=600, burst_seconds=1)  # 10/s, bursts of 10
+    started = clock.now
+    for _ in range(30):
+        limiter.acquire()
+    assert abs((clock.now - started) - 2.0) < 1e-3, clock.now - started
+
+
+@with_fake_clock
+def test_call_larger_than_bucket_is_admitted(clock):
+    # 1300 tokens at 5% of 100k TPM: far more than the bucket holds (5s of the rate)
+    limiter = RateLimiter("t", qpm=600, tpm=100_000)
+    limiter.scale = 0.05
+    started = clock.now
+    limiter.acquire(1300)
+    limiter.acquire(1300)  # Waits for the first call's debt, but is admitted
+    assert clock.now - started < 60, clock.now - started
+    # At full scale, a 40-item batch against a small TPM budget goes through too
+    limiter = RateLimiter("t", qpm=60, tpm=5_000)
+    for _ in range(3):
+        limiter.acquire(6_000)
+
+
+@with_fake_clock
+def test_throttle_halves_rate_and_pauses(clock):
+    limiter = RateLimiter("t", qpm=6000, burst_seconds=1)
+    response = type("Response", (), {"headers": {"Retry-After": "1.5"}})()
+    error = api_exceptions.TooManyRequests("slow down", response=response)
+    try:
+        with limiter.limit():
+            raise error
+    except api_exceptions.TooManyRequests:
+        pass
+    assert limiter.scale == 0.5
+    started = clock.now
+    limiter.acquire()
+    assert abs((clock.now - started) - 1.5) < 1e-3, clock.now - started
+    for _ in range(5):
+        with limiter.limit():
+            pass
+    assert abs(limiter.scale - 0.75) < 1e-9
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in globals().items() if name.startswith("test_")]
+    for name, func in tests:
+        func()
+        print(f"✅  {name}")
+    sys.exit(0)
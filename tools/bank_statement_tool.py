@@ -2,15 +2,51 @@
 
 import os
 import json
-from typing import List, Dict, Optional # Added Optional
+import asyncio
+from collections import Counter
+from typing import Iterable, Iterator, List, Dict, Optional, Sequence, Set, Tuple # Added Optional
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from google.cloud import documentai_v1 as documentai
-from google.api_core.client_options import ClientOptions
 from google.adk.tools import FunctionTool
 import logging
+import proto
+
+from tools.boilerplate_pages import BoilerplateRegistry, get_boilerplate_registry
+from tools.docai_cache import get_document_cache
+from tools.docai_client import get_async_client, get_client
+from tools.header_classifier import get_header_classifier, is_transaction_layout
+from tools.extractors import (
+    Extractor,
+    StatementPage,
+    StatementTable,
+    extract_statement_pages_async,
+    get_extractors,
+    iter_statement_pages,
+    register_extractor,
+)
+from tools.layout_registry import fingerprint, get_layout_registry
+from tools.local_ocr import TesseractExtractor, tesseract_available
+from tools.normalization import DateColumnFormat, Period, build_transactions, find_statement_period, normalize_date_column
+from tools.ocr_routing import RoutingExtractor, get_docai_state
+from tools.page_health import StatementHealth
+from tools.pdf_preflight import PreflightError, PreflightReport, fit_shard_pages, preflight
+from tools.pdf_shards import count_pages, select_pages, split_pdf
+from tools.response_archive import ResponseArchive, get_response_archive
+from tools.scan_preprocess import preprocess_for_upload
+from tools.transaction_model import Transaction
 
 logger = logging.getLogger(__name__)
 
+# --- Sharding Configuration (env overridable) ---
+# Online processing rejects requests above the processor's page limit (15 for
+# the form parser), and latency grows with page count, so long statements are
+# split into page-range shards that are processed concurrently.
+DEFAULT_SHARD_PAGES = 15
+DEFAULT_SHARD_CONCURRENCY = 8
+# Online processing request size limit; heavy scans get fewer pages per shard
+DEFAULT_MAX_REQUEST_MB = 20
+
 # Helper function to extract text (Keep the one that works from test_ocr.py)
 def get_text(doc: documentai.Document, el: documentai.Document.Page.Layout) -> str:
     """Extracts text from a Document AI layout element."""
@@ -29,151 +65,708 @@ def get_text(doc: documentai.Document, el: documentai.Document.Page.Layout) -> s
     return text.strip().replace('\n', ' ')
 
 
+
+def _raw_pb(message):
+    """Returns the underlying protobuf of a proto-plus message or repeated field."""
+    if isinstance(message, proto.Message):
+        return type(message).pb(message)
+    return getattr(message, "pb", message)
+
+
+class DocumentText:
+    """
+    Per-document text accessor for table cells.
+
+    `get_text` re-reads `doc.text` through proto-plus for every segment and
+    builds each cell with `+=`. This reads the document text and its length
+    once, walks the raw protobuf segments (plain ints, no wrapper objects),
+    and returns single-segment cells - by far the common case - as one slice.
+    """
+
+    __slots__ = ("_text", "_length")
+
+    def __init__(self, document: documentai.Document):
+        self._text = _raw_pb(document).text
+        self._length = len(self._text)
+
+    def layout_text(self, layout) -> str:
+        """Returns the normalized text of a layout (proto-plus or raw protobuf)."""
+        segments = _raw_pb(layout).text_anchor.text_segments
+        text = self._text
+        if len(segments) == 1:
+            segment = segments[0]
+            start_index, end_index = segment.start_index, segment.end_index
+            if 0 <= start_index <= end_index <= self._length:
+                raw = text[start_index:end_index]
+            else:
+                logger.warning(f"Invalid text segment indices: start={start_index}, end={end_index}, doc_len={self._length}")
+                raw = ""
+        else:
+            parts = []
+            for segment in segments:
+                start_index, end_index = segment.start_index, segment.end_index
+                if 0 <= start_index <= end_index <= self._length:
+                    parts.append(text[start_index:end_index])
+                else:
+                    logger.warning(f"Invalid text segment indices: start={start_index}, end={end_index}, doc_len={self._length}")
+            raw = "".join(parts)
+        return raw.strip().replace('\n', ' ')
+
+    def cells_text(self, cells) -> List[str]:
+        """Returns the text of every cell of a table row (`row.cells`)."""
+        layout_text = self.layout_text
+        return [layout_text(cell.layout) for cell in _raw_pb(cells)]
+
+
 # --- Function to identify the transaction table ---
-# This is a heuristic and might need adjustment based on common statement layouts
+# Header keywords live in tools/header_classifier.py (per locale, see
+# BANK_HEADER_LOCALES) and are matched by one precompiled regex.
+def classify_tables(header_lists: Sequence[List[str]]) -> List[Optional[Dict[str, int]]]:
+    """
+    Classifies the headers of several tables in one pass.
+
+    Returns:
+        For each table, its column roles (role -> column index), or None if
+        the headers don't look like a transaction table.
+    """
+    classified = get_header_classifier().classify_many(header_lists)
+    return [roles if is_transaction_layout(roles) else None for roles in classified]
+
+
 def is_transaction_table(headers: List[str]) -> bool:
     """
     Checks if a list of header strings likely represents a transaction table
-    by looking for keywords *within* the header strings. (With extra debugging)
+    by looking for date, description and amount keywords *within* the headers.
     """
     if not headers: # Handle empty header list case
-        logger.debug("Header check: Received empty headers list.")
         return False
+    return classify_tables([headers])[0] is not None
 
-    headers_lower = [h.lower().strip() for h in headers]
-    logger.debug(f"Header check: Lowercase headers = {headers_lower}") # Log lowercase headers
 
-    date_keywords = ["date", "transaction date", "posting date"]
-    desc_keywords = ["description", "details", "narrative", "transaction details"]
-    amount_keywords = ["amount", "debit", "credit"]
+# --- Document AI processing (with response cache) ---
+def get_processor_name(processor_id: Optional[str] = None) -> Optional[str]:
+    """
+    Builds the Document AI processor resource name from the environment.
+    If DOCUMENT_AI_PROCESSOR_VERSION is set, that version is pinned (only for
+    the default processor, not for an explicit `processor_id`).
+    """
+    project_id = os.getenv("GCP_PROJECT_ID")
+    location = os.getenv("GCP_LOCATION", "us")
+    processor_version = None if processor_id else os.getenv("DOCUMENT_AI_PROCESSOR_VERSION")
+    processor_id = processor_id or os.getenv("DOCUMENT_AI_PROCESSOR_ID")
 
-    # Check date
-    has_date = False
-    for h in headers_lower:
-        if any(kw in h for kw in date_keywords):
-            has_date = True
-            break
-    logger.debug(f"Header check: has_date = {has_date}")
+    if not all([project_id, location, processor_id]):
+        return None
 
-    # Check description
-    has_desc = False
-    for h in headers_lower:
-        if any(kw in h for kw in desc_keywords):
-            has_desc = True
-            break
-    logger.debug(f"Header check: has_desc = {has_desc}")
+    name = f"projects/{project_id}/locations/{location}/processors/{processor_id}"
+    if processor_version:
+        name += f"/processorVersions/{processor_version}"
+    return name
+
+
+def process_pdf(pdf_bytes: bytes, mime_type: str = "application/pdf",
+                processor_name: Optional[str] = None) -> Optional[documentai.Document]:
+    """
+    Runs a PDF through Document AI and returns the processed Document.
+    Results are served from the on-disk cache when the same bytes were already
+    processed by the same processor, skipping the network call entirely.
 
-    # Check amount
-    has_amount = False
-    for h in headers_lower:
-        if any(kw in h for kw in amount_keywords):
-            has_amount = True
-            break
-    logger.debug(f"Header check: has_amount = {has_amount}")
+    Args:
+        processor_name: Full processor resource name; defaults to get_processor_name().
 
-    # Final decision
-    result = has_date and has_desc and has_amount
-    logger.debug(f"Header check: Final result = {result} (date:{has_date}, desc:{has_desc}, amount:{has_amount})")
+    Returns:
+        The processed Document, or None if the GCP config is missing.
+    """
+    name = processor_name or get_processor_name()
+    if not name:
+        logger.error("Tool Error: Missing GCP config environment variables.")
+        return None
+
+    cache = get_document_cache()
+    cache_key = cache.key_for(pdf_bytes, name) if cache else None
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Document cache hit for {cache_key[:12]}… ({cache.stats()})")
+            return documentai.Document.deserialize(cached)
+        logger.debug(f"Document cache miss for {cache_key[:12]}…")
+
+    location = os.getenv("GCP_LOCATION", "us")
+    client = get_client(location)  # Pooled: reuses one warm gRPC channel per endpoint
+
+    raw_document = documentai.RawDocument(content=pdf_bytes, mime_type=mime_type)
+    request = documentai.ProcessRequest(name=name, raw_document=raw_document)
+
+    with get_docai_state().track():  # Queue depth and quota state for OCR routing
+        result = client.process_document(request=request)
+    document = result.document
 
-    return result
+    if cache:
+        cache.put(cache_key, documentai.Document.serialize(document))
+    return document
 
 
-# --- Main Tool Function ---
-def parse_bank_statement(*, file_path: str) -> str:
+async def process_pdf_async(pdf_bytes: bytes, mime_type: str = "application/pdf") -> Optional[documentai.Document]:
     """
-    Parses a PDF bank statement from a given file path and extracts transaction data
-    using Google Document AI, focusing on identifying the transaction table by headers.
+    Async variant of process_pdf built on the Document AI async client, so
+    several statements can be processed concurrently on one event loop.
+    """
+    name = get_processor_name()
+    if not name:
+        logger.error("Tool Error: Missing GCP config environment variables.")
+        return None
+
+    cache = get_document_cache()
+    cache_key = cache.key_for(pdf_bytes, name) if cache else None
+    if cache:
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            logger.info(f"Document cache hit for {cache_key[:12]}… ({cache.stats()})")
+            return documentai.Document.deserialize(cached)
+        logger.debug(f"Document cache miss for {cache_key[:12]}…")
+
+    location = os.getenv("GCP_LOCATION", "us")
+    client = get_async_client(location)
+
+    raw_document = documentai.RawDocument(content=pdf_bytes, mime_type=mime_type)
+    request = documentai.ProcessRequest(name=name, raw_document=raw_document)
+
+    with get_docai_state().track():  # Queue depth and quota state for OCR routing
+        result = await client.process_document(request=request)
+    document = result.document
+
+    if cache:
+        await asyncio.to_thread(cache.put, cache_key, documentai.Document.serialize(document))
+    return document
+
+
+def _shard_settings() -> Tuple[int, int]:
+    shard_pages = int(os.getenv("DOCAI_SHARD_PAGES", DEFAULT_SHARD_PAGES))
+    shard_concurrency = int(os.getenv("DOCAI_SHARD_CONCURRENCY", DEFAULT_SHARD_CONCURRENCY))
+    return shard_pages, max(1, shard_concurrency)
+
+
+def _shard_pages_for(pdf_bytes: bytes, page_count: Optional[int] = None) -> int:
+    """Pages per shard, reduced for large files so each request stays under DOCAI_MAX_REQUEST_MB."""
+    shard_pages, _ = _shard_settings()
+    max_request_bytes = int(float(os.getenv("DOCAI_MAX_REQUEST_MB", DEFAULT_MAX_REQUEST_MB)) * 1024 * 1024)
+    if len(pdf_bytes) <= max_request_bytes:
+        return shard_pages
+    if page_count is None:
+        page_count = count_pages(pdf_bytes)
+    return fit_shard_pages(len(pdf_bytes), page_count, shard_pages, max_request_bytes)
+
+
+def iter_shard_documents(pdf_bytes: bytes, page_count: Optional[int] = None,
+                         processor_name: Optional[str] = None) -> Iterator[Tuple[int, documentai.Document]]:
+    """
+    Processes a PDF as page-range shards in parallel (each shard is cached on
+    its own) and yields (first_page_index, Document) in page order as soon as
+    each shard and all shards before it are done.
 
-    Args:
-        file_path: The absolute path to the PDF file.
+    Raises:
+        RuntimeError: If the GCP config is missing.
+    """
+    _, shard_concurrency = _shard_settings()
+    shards = split_pdf(pdf_bytes, _shard_pages_for(pdf_bytes, page_count))
+    if len(shards) == 1:
+        document = process_pdf(pdf_bytes, processor_name=processor_name)
+        if document is None:
+            raise RuntimeError("Missing GCP config environment variables.")
+        yield 0, document
+        return
+
+    with ThreadPoolExecutor(max_workers=min(len(shards), shard_concurrency)) as pool:
+        futures = [(start, pool.submit(process_pdf, shard, processor_name=processor_name)) for start, shard in shards]
+        try:
+            for start, future in futures:
+                document = future.result()
+                if document is None:
+                    raise RuntimeError("Missing GCP config environment variables.")
+                yield start, document
+        finally:
+            # Consumer stopped early (or a shard failed): don't start queued shards.
+            for _, future in futures:
+                future.cancel()
+
+
+async def process_pdf_sharded_async(pdf_bytes: bytes, page_count: Optional[int] = None) -> List[Tuple[int, documentai.Document]]:
+    """
+    Processes a PDF as page-range shards concurrently on the event loop, so a
+    long statement costs about the latency of its slowest shard.
 
     Returns:
-        JSON string of extracted transactions, or an empty JSON array '[]' on error or if no transaction table is found.
+        List of (first_page_index, Document) in page order; empty if the GCP
+        config is missing.
     """
-    try:
-        pdf_path_obj = Path(file_path)
-        if not pdf_path_obj.is_file():
-            logger.error(f"Tool Error: File not found at path: {file_path}")
-            return json.dumps([])
+    _, shard_concurrency = _shard_settings()
+    shard_pages = await asyncio.to_thread(_shard_pages_for, pdf_bytes, page_count)
+    shards = await asyncio.to_thread(split_pdf, pdf_bytes, shard_pages)
+    semaphore = asyncio.Semaphore(shard_concurrency)
 
-        pdf_bytes = pdf_path_obj.read_bytes()
-        mime_type = "application/pdf"
+    async def process_shard(shard: bytes) -> Optional[documentai.Document]:
+        async with semaphore:
+            return await process_pdf_async(shard)
 
-        project_id = os.getenv("GCP_PROJECT_ID")
-        location = os.getenv("GCP_LOCATION", "us")
-        processor_id = os.getenv("DOCUMENT_AI_PROCESSOR_ID")
+    documents = await asyncio.gather(*(process_shard(shard) for _, shard in shards))
+    if any(document is None for document in documents):
+        return []
+    return [(start, document) for (start, _), document in zip(shards, documents)]
 
-        if not all([project_id, location, processor_id]):
-            logger.error("Tool Error: Missing GCP config environment variables.")
-            return json.dumps([])
-
-        client = documentai.DocumentProcessorServiceClient(
-            client_options=ClientOptions(api_endpoint=f"{location}-documentai.googleapis.com")
-        )
-        name = f"projects/{project_id}/locations/{location}/processors/{processor_id}"
 
-        raw_document = documentai.RawDocument(content=pdf_bytes, mime_type=mime_type)
-        request = documentai.ProcessRequest(name=name, raw_document=raw_document)
+# --- Document AI extraction backend ---
+def document_pages(document: documentai.Document, page_indices: Optional[Sequence[int]] = None,
+                   page_offset: int = 0) -> Iterator[StatementPage]:
+    """
+    Converts the pages of a processed Document into the common page model.
 
-        result = client.process_document(request=request)
-        document = result.document
+    Args:
+        document: The Document AI response (proto-plus or raw protobuf).
+        page_indices: Original page index of each page that was sent to
+            Document AI, when only a subset of the PDF was uploaded.
+        page_offset: Position of the document's first page within the pages
+            that were sent (shards start part-way through).
+    """
+    # Walk the raw protobuf rather than proto-plus, which allocates a wrapper
+    # object on every attribute access (pages, tables, rows, cells, segments).
+    document_pb = _raw_pb(document)
+    doc_text = DocumentText(document_pb)
+    for position, page in enumerate(document_pb.pages, start=page_offset):
+        index = page_indices[position] if page_indices is not None else position
+        tables = []
+        for table_number, table in enumerate(page.tables):
+            headers = doc_text.cells_text(table.header_rows[0].cells) if table.header_rows else []
+            rows = [doc_text.cells_text(body_row.cells) for body_row in table.body_rows]
+            tables.append(StatementTable(table_number, headers, rows))
+        yield StatementPage(index, doc_text.layout_text(page.layout), tables, DocumentAIExtractor.name)
+
+
+class DocumentAIExtractor(Extractor):
+    """
+    OCR backend: uploads the (sub)set of pages to Document AI, sharded and
+    cached, with scanned pages optionally re-encoded first (DOCAI_UPLOAD_DPI).
+    Every response is kept in the response archive for later re-parsing, and
+    pages fixed by page repair are taken from there instead of the response.
+    """
 
-        logger.info(f"Document AI processed {len(document.pages)} pages for {file_path}.")
+    name = "docai"
+
+    @staticmethod
+    def _archive(archive: Optional[ResponseArchive], statement: str, source: str, page_indices: Sequence[int],
+                 start: int, document: documentai.Document) -> None:
+        if archive:
+            pages = page_indices[start:start + len(document.pages)]
+            archive.save(statement, source, pages, get_processor_name() or "", document)
+
+    @staticmethod
+    def _repaired_pages(archive: Optional[ResponseArchive], statement: str,
+                        page_indices: Sequence[int]) -> Dict[int, StatementPage]:
+        """Pages that `main.py repair` re-OCR'd for this statement, by page index (latest repair wins)."""
+        repaired: Dict[int, StatementPage] = {}
+        if not archive:
+            return repaired
+        wanted = set(page_indices)
+        for entry in archive.repairs(statement):
+            indices = wanted.intersection(entry.repaired)
+            if not indices:
+                continue
+            try:
+                document = archive.load(entry)
+            except Exception as e:  # A missing or corrupt blob only loses the repair
+                logger.warning(f"Could not load repaired pages {sorted(i + 1 for i in indices)}: {e}")
+                continue
+            repaired.update((page.index, page) for page in document_pages(document, entry.pages)
+                            if page.index in indices)
+        if repaired:
+            logger.info(f"Using repaired Document AI pages {sorted(i + 1 for i in repaired)}.")
+        return repaired
+
+    def iter_pages(self, pdf_bytes: bytes, page_indices: Sequence[int], source: str = "document") -> Iterator[StatementPage]:
+        selected = preprocess_for_upload(select_pages(pdf_bytes, page_indices))
+        archive = get_response_archive()
+        statement = ResponseArchive.statement_id(pdf_bytes) if archive else ""
+        repaired = self._repaired_pages(archive, statement, page_indices)
+        page_count = 0
+        for start, document in iter_shard_documents(selected, len(page_indices)):
+            page_count += len(document.pages)
+            self._archive(archive, statement, source, page_indices, start, document)
+            logger.debug(f"Decoding Document AI pages {start + 1}-{start + len(document.pages)}.")
+            for page in document_pages(document, page_indices, start):
+                yield repaired.get(page.index, page)
+        logger.info(f"Document AI processed {page_count} pages.")
+
+    async def extract_pages_async(self, pdf_bytes: bytes, page_indices: Sequence[int],
+                                  source: str = "document") -> List[StatementPage]:
+        selected = await asyncio.to_thread(lambda: preprocess_for_upload(select_pages(pdf_bytes, page_indices)))
+        shards = await process_pdf_sharded_async(selected, len(page_indices))
+        if not shards:
+            raise RuntimeError("Missing GCP config environment variables.")
+        archive = get_response_archive()
+        repaired: Dict[int, StatementPage] = {}
+        if archive:
+            statement = await asyncio.to_thread(ResponseArchive.statement_id, pdf_bytes)
+            repaired = await asyncio.to_thread(self._repaired_pages, archive, statement, page_indices)
+            for start, document in shards:
+                await asyncio.to_thread(self._archive, archive, statement, source, page_indices, start, document)
+        pages = [repaired.get(page.index, page)
+                 for start, document in shards for page in document_pages(document, page_indices, start)]
+        logger.info(f"Document AI processed {len(pages)} pages in {len(shards)} shard(s).")
+        return pages
+
+
+register_extractor(DocumentAIExtractor.name, DocumentAIExtractor)
+register_extractor(TesseractExtractor.name, TesseractExtractor)
+# Document AI normally, local OCR while it is over quota, down or backed up
+register_extractor(RoutingExtractor.name, lambda: RoutingExtractor(
+    DocumentAIExtractor(), TesseractExtractor(), get_docai_state(), tesseract_available))
+
+
+# --- Transaction table extraction ---
+def _table_roles(tables: Sequence[StatementTable]) -> List[Optional[Dict[str, int]]]:
+    """Column roles of each table (None for headerless and non-transaction tables), resolved in one pass."""
+    resolved = iter(get_layout_registry().resolve_many([t.headers for t in tables if t.headers], classify_tables))
+    return [next(resolved) if table.headers else None for table in tables]
+
+
+def page_transaction_layout(page: StatementPage) -> Optional[str]:
+    """Returns the layout fingerprint of the page's first transaction table, if it has one."""
+    for table, roles in zip(page.tables, _table_roles(page.tables)):
+        if roles is not None:
+            return fingerprint(table.headers)
+    return None
+
+
+def page_has_transaction_table(page: StatementPage) -> bool:
+    """True if any table on the page resolves to a transaction table layout."""
+    return page_transaction_layout(page) is not None
+
+
+class HeaderCarry:
+    """
+    Carries the header of the last transaction table forward, so a table that
+    continues it on a later page without a header row of its own is still
+    read. Pages must be fed in page order.
+    """
 
-        transactions: List[Dict[str, str]] = []
-        found_transaction_table = False
+    def __init__(self):
+        self.headers: Optional[List[str]] = None
+        self.roles: Optional[Dict[str, int]] = None
+
+    def remember(self, headers: List[str], roles: Dict[str, int]) -> None:
+        self.headers, self.roles = headers, roles
+
+    def continuation_rows(self, table: StatementTable) -> Optional[List[List[str]]]:
+        """
+        The rows of `table` if it continues the carried table: a table without
+        a header row of its own, mostly rows of the same column count, most of
+        them with a date in the date column. Document AI returns such tables
+        without header rows; the text-layer backend promotes their first data
+        row to header, which is taken back only if its date cell is a date.
+        """
+        if self.headers is None:
+            return None
+        width = len(self.headers)
+        rows = ([table.headers] if table.headers else []) + table.rows
+        if not rows or Counter(len(row) for row in rows).most_common(1)[0][0] != width:
+            return None
+        date_column = self.roles["date"]
+        if table.headers and (len(table.headers) != width or normalize_date_column([table.headers[date_column]])[0] is None):
+            return None  # A real header: some other table
+        dates = normalize_date_column([row[date_column] for row in rows if len(row) == width])
+        if sum(day is not None for day in dates) * 2 <= len(rows):
+            return None
+        return rows
+
+    def page_has_transaction_table(self, page: StatementPage) -> bool:
+        """Routing predicate: the page has a transaction table, or continues the last one seen."""
+        found = False
+        for table, roles in zip(page.tables, _table_roles(page.tables)):
+            if roles is not None:
+                self.remember(table.headers, roles)
+                found = True
+            elif self.continuation_rows(table) is not None:
+                found = True
+        return found
+
+
+def iter_page_transactions(pages: Iterable[StatementPage], source: str = "document",
+                           period: Optional[Period] = None,
+                           health: Optional[StatementHealth] = None) -> Iterator[Transaction]:
+    """
+    Walks the tables of extracted pages in order and yields the rows of every
+    table whose headers look like a transaction table, and of headerless
+    tables that continue the previous one (see HeaderCarry).
 
-        for page_number, page in enumerate(document.pages):
-            logger.debug(f"Scanning Page {page_number + 1} with {len(page.tables)} tables.")
-            for table_number, table in enumerate(page.tables):
-                if not table.header_rows:
-                    logger.debug(f"Skipping Table {table_number + 1} on page {page_number + 1} (no header rows).")
+    Args:
+        pages: Pages from any extraction backend, in page order.
+        source: Label used in log messages (usually the file path).
+        period: Statement period used to infer the year of dates like
+            "12 Jan"; detected from the page text when not given.
+        health: If given, filled in with each page's extraction health
+            (skipped rows, tables that failed the header check).
+
+    Yields:
+        Transaction records with canonical fields and global page numbers.
+    """
+    found_transaction_table = False
+    carry = HeaderCarry()
+    date_format = DateColumnFormat()  # Chosen on the first table, reused by the rest
+
+    for page in pages:
+        page_number = page.index
+        logger.debug(f"Scanning Page {page_number + 1} ({page.backend}) with {len(page.tables)} tables.")
+        if period is None:
+            period = find_statement_period(page.text)
+        page_health = health.page(page_number, page.backend) if health is not None else None
+
+        for table in page.tables:
+            if table.headers:
+                logger.info(f"Table {table.table_number + 1} Headers: {table.headers}")
+
+        # Known bank layouts resolve from the registry; the header classifier
+        # only runs (once, for all of them) on layouts we haven't seen before
+        page_roles = _table_roles(page.tables)
+
+        for table, column_roles in zip(page.tables, page_roles):
+            table_number = table.table_number
+            if column_roles is not None:
+                logger.info(f"--> Found potential transaction table (Table {table_number + 1}) on page {page_number + 1}. Column roles: {column_roles}")
+                headers, table_rows = table.headers, table.rows
+                carry.remember(headers, column_roles)
+            else:
+                # Tables continued from an earlier page often come without a header row
+                table_rows = carry.continuation_rows(table)
+                if table_rows is None:
+                    if not table.headers:
+                        logger.debug(f"Skipping Table {table_number + 1} on page {page_number + 1} (no header rows).")
+                    if page_health and table.rows:
+                        page_health.unmatched_widths.append(len(table.headers) or len(table.rows[0]))
                     continue
+                headers, column_roles = carry.headers, carry.roles
+                logger.info(f"--> Table {table_number + 1} on page {page_number + 1} continues the previous transaction table "
+                            f"({len(table_rows)} rows without a header of their own).")
+            found_transaction_table = True
+
+            rows, row_numbers = [], []
+            for row_index, row_values in enumerate(table_rows):
+                # Ensure we don't go out of bounds if row has fewer cells than header
+                if len(row_values) >= len(headers):
+                    rows.append(row_values)
+                    row_numbers.append(row_index + 1)
+                else:
+                    if page_health:
+                        page_health.mismatched_rows += 1
+                    logger.warning(f"Skipping row {row_index+1} in Table {table_number+1} (Page {page_number+1}) due to cell count mismatch (Headers: {len(headers)}, Cells: {len(row_values)}) Row: {row_values}")
+
+            if page_health:
+                page_health.transaction_widths.append(len(headers))
+                page_health.rows += len(rows)
+            # Amounts and dates are normalized a whole column at a time
+            yield from build_transactions(rows, column_roles, page=page_number + 1, row_numbers=row_numbers, period=period,
+                                          date_format=date_format)
+
+    if not found_transaction_table:
+        logger.debug(f"No tables matching transaction criteria found in {source}.")
+
+
+def iter_document_transactions(document: documentai.Document, source: str = "document", page_offset: int = 0,
+                               period: Optional[Period] = None) -> Iterator[Transaction]:
+    """
+    Yields the transactions of a processed Document.
 
-                # Extract actual headers from the first header row
-                header_row = table.header_rows[0]
-                actual_headers = [get_text(document, cell.layout) for cell in header_row.cells]
-                logger.info(f"Table {table_number + 1} Headers: {actual_headers}")
+    Args:
+        document: The Document AI response (proto-plus or raw protobuf).
+        source: Label used in log messages (usually the file path).
+        page_offset: Index of the document's first page within the original
+            statement, so shards report global page numbers.
+        period: Statement period; detected from the document text when not given.
+    """
+    pages = document_pages(document, page_offset=page_offset)
+    return iter_page_transactions(pages, source=source, period=period)
 
-                # Check if this looks like the transaction table using our heuristic
-                if is_transaction_table(actual_headers):
-                    logger.info(f"--> Found potential transaction table (Table {table_number + 1}) on page {page_number + 1}.")
-                    found_transaction_table = True
 
-                    # Use the *actual headers* (lowercase) for mapping
-                    header_keys = [h.lower().strip() for h in actual_headers]
+def extract_transactions(document: documentai.Document, source: str = "document", page_offset: int = 0,
+                         period: Optional[Period] = None) -> List[Transaction]:
+    """
+    Returns the rows of every transaction table in a processed Document.
+    See iter_document_transactions for the arguments.
+    """
+    return list(iter_document_transactions(document, source=source, page_offset=page_offset, period=period))
+
+
+# --- Statement extraction (raises on failure) ---
+def _log_extracted(transactions: List[Transaction], file_path: str) -> None:
+    if not transactions:
+        logger.warning(f"No tables matching transaction criteria found in {file_path}.")
+    logger.info(f"Extracted {len(transactions)} transaction rows.")
 
-                    for row_index, body_row in enumerate(table.body_rows):
-                        row_values = [get_text(document, cell.layout) for cell in body_row.cells]
 
-                        # Create a dictionary for the row, mapping header to value
-                        # Ensure we don't go out of bounds if row has fewer cells than header
-                        if len(row_values) >= len(header_keys):
-                            # Create dictionary using actual headers as keys
-                            row_dict = dict(zip(header_keys, row_values))
-                            transactions.append(row_dict)
-                        else:
-                            logger.warning(f"Skipping row {row_index+1} in Table {table_number+1} (Page {page_number+1}) due to cell count mismatch (Headers: {len(header_keys)}, Cells: {len(row_values)}) Row: {row_values}")
+def _boilerplate_pages(boilerplate: Optional[BoilerplateRegistry], report: PreflightReport, file_path: str) -> List[int]:
+    """Pages whose exact content was seen before, repeatedly, without a transaction table."""
+    skip_pages = boilerplate.known_boilerplate(report.page_hashes) if boilerplate else []
+    if skip_pages:
+        logger.info(f"Skipping {len(skip_pages)} of {report.page_count} pages of {file_path} as known boilerplate: "
+                    f"{[i + 1 for i in skip_pages]}")
+    return skip_pages
 
-                    # Optional: If you assume only ONE transaction table per document, you could break here
-                    # break # Uncomment if you only want the first matching table
 
-            # Optional: If you only want the first matching table across pages, you could break here too
-            # if found_transaction_table:
-            #     break
+def _track_layouts(pages: Iterable[StatementPage], page_layouts: Dict[int, Optional[str]]) -> Iterator[StatementPage]:
+    for page in pages:
+        page_layouts[page.index] = page_transaction_layout(page)
+        yield page
 
-        if not found_transaction_table:
-             logger.warning(f"No tables matching transaction criteria found in {file_path}.")
 
-        logger.info(f"Extracted {len(transactions)} transaction rows.")
-        return json.dumps(transactions, ensure_ascii=False)
+def _track_rows(transactions: Iterable[Transaction], row_pages: Set[int]) -> Iterator[Transaction]:
+    for transaction in transactions:
+        row_pages.add(transaction.page - 1)
+        yield transaction
+
+
+def _remember_boilerplate(boilerplate: Optional[BoilerplateRegistry], pdf_bytes: bytes, report: PreflightReport,
+                          page_layouts: Dict[int, Optional[str]], row_pages: Set[int]) -> None:
+    # Only statements with a recognized transaction table tell us which bank's boilerplate this is
+    layouts = [layout for layout in page_layouts.values() if layout]
+    if boilerplate and layouts:
+        # Pages that produced rows (continuations too) or hold a transaction table, even an empty one
+        transaction_pages = row_pages | {index for index, layout in page_layouts.items() if layout}
+        boilerplate.observe(layouts[0], ResponseArchive.statement_id(pdf_bytes), report.page_hashes,
+                            transaction_pages, page_layouts.keys())
+
+
+def iter_transactions(file_path: str) -> Iterator[Transaction]:
+    """
+    Yields the transaction rows of a PDF statement page by page, as each
+    page's tables are decoded, so downstream work can start before the whole
+    statement is processed and memory stays flat for very large statements.
+
+    Pages known to be boilerplate for the bank (identical content seen before
+    without a transaction table) are skipped. The rest are read from the
+    PDF's text layer when possible; only pages without usable text, or where
+    no transaction table was found, go through the next backend in
+    STATEMENT_EXTRACTORS (OCR: Document AI, or local Tesseract while
+    Document AI is unavailable).
+
+    Raises:
+        PreflightError: If the file is rejected before any extraction (not a
+            PDF, password protected, too large).
+        RuntimeError: If OCR is needed but neither Document AI (GCP config)
+            nor local OCR is available.
+    """
+    pdf_bytes = Path(file_path).read_bytes()
+    report = preflight(pdf_bytes, source=file_path)
+    boilerplate = get_boilerplate_registry()
+    skip_pages = _boilerplate_pages(boilerplate, report, file_path)
+
+    page_layouts: Dict[int, Optional[str]] = {}
+    row_pages: Set[int] = set()
+    health = StatementHealth()
+    pages = iter_statement_pages(pdf_bytes, report.page_count, get_extractors(), HeaderCarry().page_has_transaction_table,
+                                 report, skip_pages, source=file_path)
+    transactions = iter_page_transactions(_track_layouts(pages, page_layouts), source=file_path, health=health)
+    yield from _track_rows(transactions, row_pages)
+    _remember_boilerplate(boilerplate, pdf_bytes, report, page_layouts, row_pages)
+    health.log_summary(file_path)
+
+
+def extract_statement(file_path: str) -> List[Transaction]:
+    """
+    Extracts the transaction rows of a PDF statement. Unlike the tool
+    functions this raises on failure, so batch callers can record errors.
+    """
+    transactions = list(iter_transactions(file_path))
+    _log_extracted(transactions, file_path)
+    return transactions
+
+
+async def extract_statement_async(file_path: str) -> List[Transaction]:
+    """Async variant of extract_statement."""
+    pdf_bytes = await asyncio.to_thread(Path(file_path).read_bytes)
+    report = await asyncio.to_thread(preflight, pdf_bytes, file_path)
+    boilerplate = get_boilerplate_registry()
+    skip_pages = await asyncio.to_thread(_boilerplate_pages, boilerplate, report, file_path)
+
+    page_layouts: Dict[int, Optional[str]] = {}
+    pages = await extract_statement_pages_async(pdf_bytes, report.page_count, get_extractors(),
+                                                HeaderCarry().page_has_transaction_table, report, skip_pages,
+                                                source=file_path)
+    health = StatementHealth()
+    # Row mapping, date/amount normalization and layout registry I/O are CPU
+    # and disk work: keep them off the event loop like the steps above
+    transactions = await asyncio.to_thread(
+        lambda: list(iter_page_transactions(_track_layouts(pages, page_layouts), source=file_path, health=health)))
+    row_pages = {t.page - 1 for t in transactions}
+    await asyncio.to_thread(_remember_boilerplate, boilerplate, pdf_bytes, report, page_layouts, row_pages)
+    health.log_summary(file_path)
+    _log_extracted(transactions, file_path)
+    return transactions
+
+
+# --- Main Tool Function ---
+def parse_bank_statement(*, file_path: str) -> str:
+    """
+    Parses a PDF bank statement from a given file path and extracts transaction data
+    from the PDF's text layer, or with Google Document AI OCR for scanned pages,
+    focusing on identifying the transaction table by headers.
+
+    Args:
+        file_path: The absolute path to the PDF file.
+
+    Returns:
+        JSON string of extracted transactions, or an empty JSON array '[]' on error or if no transaction table is found.
+    """
+    try:
+        pdf_path_obj = Path(file_path)
+        if not pdf_path_obj.is_file():
+            logger.error(f"Tool Error: File not found at path: {file_path}")
+            return json.dumps([])
+
+        transactions = extract_statement(file_path)
+        return json.dumps([t.to_dict() for t in transactions], ensure_ascii=False)
+
+    except FileNotFoundError:
+        logger.error(f"Tool Error: File not found at path: {file_path}")
+        return json.dumps([])
+    except PreflightError as e:
+        logger.error(f"Tool Error: {e}")
+        return json.dumps([])
+    except Exception as e:
+        logger.error(f"Tool Error: An unexpected error occurred: {e}", exc_info=True)
+        return json.dumps([])
+
+
+async def parse_bank_statement_async(*, file_path: str) -> str:
+    """
+    Parses a PDF bank statement from a given file path and extracts transaction data
+    from the PDF's text layer, or with Google Document AI OCR for scanned pages,
+    focusing on identifying the transaction table by headers.
+
+    Args:
+        file_path: The absolute path to the PDF file.
+
+    Returns:
+        JSON string of extracted transactions, or an empty JSON array '[]' on error or if no transaction table is found.
+    """
+    # Same contract as parse_bank_statement, but the Document AI round trip and
+    # file/cache I/O never block the event loop the ADK Runner is driving.
+    try:
+        pdf_path_obj = Path(file_path)
+        if not pdf_path_obj.is_file():
+            logger.error(f"Tool Error: File not found at path: {file_path}")
+            return json.dumps([])
+
+        transactions = await extract_statement_async(file_path)
+        return json.dumps([t.to_dict() for t in transactions], ensure_ascii=False)
 
     except FileNotFoundError:
         logger.error(f"Tool Error: File not found at path: {file_path}")
         return json.dumps([])
+    except PreflightError as e:
+        logger.error(f"Tool Error: {e}")
+        return json.dumps([])
     except Exception as e:
         logger.error(f"Tool Error: An unexpected error occurred: {e}", exc_info=True)
         return json.dumps([])
 
-# Register the function as a tool
-bank_statement_tool = FunctionTool(parse_bank_statement)
\ No newline at end of file
+# Register the functions as tools
+bank_statement_tool = FunctionTool(parse_bank_statement)
+bank_statement_async_tool = FunctionTool(parse_bank_statement_async)
@@ -0,0 +1,135 @@
+# tools/boilerplate_pages.py
+
+import os
+import json
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_PATH = ".cache/bank_boilerplate.json"
+# A page is only skipped after this many distinct statements showed it without
+# a transaction table, so a one-off page (e.g. a month without transactions)
+# is never dropped, and re-running one statement never counts twice
+DEFAULT_MIN_SIGHTINGS = 2
+# Pages kept per bank layout; the least seen are forgotten first
+MAX_PAGES_PER_LAYOUT = 200
+_STATEMENT_ID_CHARS = 16  # Enough to tell statements apart
+REGISTRY_VERSION = 2
+
+
+class BoilerplateRegistry:
+    """
+    Remembers, per bank layout, the content hashes of pages that never held a
+    transaction table (terms and conditions, marketing inserts, notices).
+
+    Content that identical never changes what it holds, so once a page hash
+    has been seen often enough without a transaction table, later statements
+    can drop it before upload.
+    """
+
+    def __init__(self, path: str, min_sightings: int = DEFAULT_MIN_SIGHTINGS):
+        self.path = Path(path)
+        self.min_sightings = max(1, min_sightings)
+        self.pages_skipped = 0
+        self._lock = threading.Lock()
+        # layout fingerprint -> {page hash: ids of the statements that showed it without transactions}
+        self._layouts: Optional[Dict[str, Dict[str, List[str]]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, List[str]]]:
+        # Called with the lock held.
+        if self._layouts is None:
+            self._layouts = {}
+            if self.path.is_file():
+                try:
+                    data = json.loads(self.path.read_text(encoding="utf-8"))
+                    if data.get("version") == REGISTRY_VERSION:
+                        self._layouts = data["layouts"]
+                except (OSError, ValueError, KeyError, AttributeError) as e:
+                    logger.warning(f"Could not read boilerplate registry {self.path}, starting empty: {e}")
+        return self._layouts
+
+    def _save(self) -> None:
+        # Called with the lock held.
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Unique per writer, so processes sharing the registry never write the same temp file
+            fd, tmp_name = tempfile.mkstemp(prefix=f"{self.path.name}.", suffix=".tmp", dir=self.path.parent)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": REGISTRY_VERSION, "layouts": self._layouts}, f, indent=1)
+            os.replace(tmp_name, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save boilerplate registry {self.path}: {e}")
+
+    def known_boilerplate(self, page_hashes: Sequence[str]) -> List[int]:
+        """Returns the indices of pages known to be boilerplate for some bank layout."""
+        with self._lock:
+            layouts = self._load()
+            skip = [
+                index for index, page_hash in enumerate(page_hashes)
+                if any(len(pages.get(page_hash, ())) >= self.min_sightings for pages in layouts.values())
+            ]
+            self.pages_skipped += len(skip)
+        return skip
+
+    def observe(self, layout: str, statement: str, page_hashes: Sequence[str], transaction_pages: Iterable[int],
+                processed_pages: Iterable[int]) -> None:
+        """
+        Records the outcome of one statement (`statement`: its content hash)
+        whose transaction tables use `layout`: processed pages without
+        transactions count as one sighting per distinct statement, and pages
+        with transactions are never treated as boilerplate.
+        """
+        statement = statement[:_STATEMENT_ID_CHARS]
+        transaction_hashes = {page_hashes[i] for i in transaction_pages}
+        with self._lock:
+            layouts = self._load()
+            pages = layouts.setdefault(layout, {})
+            for page_hash in transaction_hashes:
+                for known in layouts.values():
+                    known.pop(page_hash, None)
+            for index in processed_pages:
+                page_hash = page_hashes[index]
+                if page_hash in transaction_hashes:
+                    continue
+                seen = pages.setdefault(page_hash, [])
+                if statement not in seen and len(seen) < self.min_sightings:
+                    seen.append(statement)
+            if len(pages) > MAX_PAGES_PER_LAYOUT:
+                kept = sorted(pages.items(), key=lambda item: len(item[1]), reverse=True)[:MAX_PAGES_PER_LAYOUT]
+                layouts[layout] = dict(kept)
+            self._save()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            layouts = self._load()
+            return {
+                "layouts": len(layouts),
+                "boilerplate_pages": sum(1 for pages in layouts.values() for seen in pages.values()
+                                         if len(seen) >= self.min_sightings),
+                "pages_skipped": self.pages_skipped,
+            }
+
+
+_registry: Optional[BoilerplateRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_boilerplate_registry() -> Optional[BoilerplateRegistry]:
+    """
+    Returns the process-wide boilerplate registry (path from
+    BANK_BOILERPLATE_REGISTRY), or None if BOILERPLATE_SKIP_ENABLED is false.
+    """
+    global _registry
+    if os.getenv("BOILERPLATE_SKIP_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _registry_lock:
+        if _registry is None:
+            _registry = BoilerplateRegistry(
+                os.getenv("BANK_BOILERPLATE_REGISTRY", DEFAULT_REGISTRY_PATH),
+                int(os.getenv("BOILERPLATE_MIN_SIGHTINGS", DEFAULT_MIN_SIGHTINGS)),
+            )
+        return _registry
@@ -0,0 +1,121 @@
+# tools/bulk_ingest.py
+
+import asyncio
+import glob
+import json
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from tools.bank_statement_tool import extract_statement_async
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 4
+
+
+def collect_pdfs(source: str) -> List[Path]:
+    """
+    Resolves a directory (searched recursively) or a glob pattern to a sorted
+    list of PDF files.
+    """
+    source_path = Path(source)
+    if source_path.is_dir():
+        files = [p for p in source_path.rglob("*") if p.is_file() and p.suffix.lower() == ".pdf"]
+    else:
+        files = [Path(p) for p in glob.glob(source, recursive=True)]
+        files = [p for p in files if p.is_file() and p.suffix.lower() == ".pdf"]
+    return sorted(p.resolve() for p in files)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile; returns 0.0 for an empty sequence."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _output_name(pdf_path: Path, root: Path) -> str:
+    # Flatten the path relative to the batch root so equal file names in
+    # different sub-directories don't overwrite each other.
+    try:
+        relative = pdf_path.relative_to(root)
+    except ValueError:
+        relative = Path(pdf_path.name)
+    return "__".join(relative.with_suffix("").parts) + ".json"
+
+
+async def ingest_async(source: str, output_dir: str, concurrency: int = DEFAULT_CONCURRENCY) -> Dict[str, Any]:
+    """
+    Extracts transactions from every PDF matched by `source`, with at most
+    `concurrency` statements in flight at once.
+
+    Writes one `<name>.json` per statement and a `summary.json` into
+    `output_dir`, and returns the summary dict.
+    """
+    pdfs = collect_pdfs(source)
+    out_path = Path(output_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+    root = Path(os.path.commonpath([str(p.parent) for p in pdfs])) if pdfs else Path(".")
+    logger.info(f"Bulk ingest: {len(pdfs)} PDFs from '{source}' -> '{out_path}' (concurrency {concurrency}).")
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results: List[Dict[str, Any]] = []
+
+    async def process_one(pdf_path: Path) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            record: Dict[str, Any] = {"file": str(pdf_path), "output": None, "error": None}
+            try:
+                transactions = await extract_statement_async(str(pdf_path))
+                target = out_path / _output_name(pdf_path, root)
+                payload = json.dumps([t.to_dict() for t in transactions], ensure_ascii=False, indent=2)
+                await asyncio.to_thread(target.write_text, payload, encoding="utf-8")
+                record["output"] = str(target)
+                record["transactions"] = len(transactions)
+            except Exception as e:
+                logger.error(f"Bulk ingest: failed to process {pdf_path}: {e}", exc_info=True)
+                record["error"] = f"{type(e).__name__}: {e}"
+            record["latency_seconds"] = round(time.perf_counter() - started, 3)
+            results.append(record)
+            logger.info(f"Bulk ingest: {len(results)}/{len(pdfs)} done ({pdf_path.name}, {record['latency_seconds']}s).")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(process_one(p) for p in pdfs))
+    wall_seconds = time.perf_counter() - started
+
+    results.sort(key=lambda r: r["file"])
+    latencies = [r["latency_seconds"] for r in results]
+    failures = [r for r in results if r["error"]]
+    summary = {
+        "source": source,
+        "files": len(pdfs),
+        "succeeded": len(pdfs) - len(failures),
+        "failed": len(failures),
+        "transactions": sum(r.get("transactions", 0) for r in results),
+        "concurrency": concurrency,
+        "wall_seconds": round(wall_seconds, 3),
+        "files_per_second": round(len(pdfs) / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "latency_seconds": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies, default=0.0),
+        },
+        "failures": [{"file": r["file"], "error": r["error"]} for r in failures],
+        "results": results,
+    }
+    summary_path = out_path / "summary.json"
+    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    logger.info(f"Bulk ingest finished: {summary['succeeded']}/{summary['files']} succeeded in {summary['wall_seconds']}s. Summary: {summary_path}")
+    return summary
+
+
+def ingest(source: str, output_dir: str, concurrency: int = DEFAULT_CONCURRENCY) -> Dict[str, Any]:
+    """Synchronous entry point for ingest_async."""
+    return asyncio.run(ingest_async(source, output_dir, concurrency))
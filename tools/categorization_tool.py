@@ -1,8 +1,10 @@
 import os
 import json
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any
-import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Sequence
 
 # --- Use Vertex AI SDK ---
 import vertexai
@@ -12,6 +14,10 @@ from vertexai.generative_models import HarmCategory, HarmBlockThreshold # For sa
 from google.adk.tools import FunctionTool
 from dotenv import load_dotenv
 
+from tools.category_cache import get_category_cache
+from tools.merchant_normalizer import merchant_key
+from tools.rate_limiter import THROTTLE_ERRORS, get_rate_limiter
+
 load_dotenv(override=True)
 
 logger = logging.getLogger(__name__)
@@ -43,75 +49,191 @@ CATEGORIES = [
     "Charity/Donations", "Other Expenses", "Uncategorized"
 ]
 
+# Cached categories are only reused for the same taxonomy
+TAXONOMY_VERSION = os.getenv("CATEGORY_TAXONOMY_VERSION") or hashlib.sha1("\n".join(CATEGORIES).encode("utf-8")).hexdigest()[:12]
+
 # --- LLM Model for Categorization (Vertex AI Model Name) ---
 # Use the appropriate Vertex AI model identifier
 CAT_MODEL_NAME = "gemini-1.5-pro" # Or "gemini-1.5-flash-001" or other suitable Vertex model
 
-# --- Helper function to call the categorization LLM using Vertex AI SDK ---
-def get_category_from_llm_vertex(description: str) -> str:
-    """Calls the Vertex AI Gemini API to categorize a single transaction description."""
-    if not description:
-        return "Uncategorized"
+# Descriptions sent per categorization call (CATEGORIZATION_BATCH_SIZE)
+DEFAULT_BATCH_SIZE = 40
+# Rate-limited batches are retried whole (after the limiter's back-off) this many times
+MAX_THROTTLED_RETRIES = 5
+
+SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+}
+
+# Structured output for batched calls: one {index, category} per description
+BATCH_RESPONSE_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "index": {"type": "integer"},
+            "category": {"type": "string", "enum": CATEGORIES},
+        },
+        "required": ["index", "category"],
+    },
+}
+
+def estimate_tokens(prompt: str, outputs: int) -> int:
+    """Rough model token count of a call (about 4 characters per token, ~16 tokens per answer item), for TPM limiting."""
+    return len(prompt) // 4 + 16 * outputs
 
-    # Check if Vertex AI was initialized successfully
-    # (A more robust check might involve trying a dummy call or checking a global flag)
-    if not PROJECT_ID or not LOCATION:
-         logger.error("Vertex AI not initialized due to missing config. Cannot categorize.")
-         return "Uncategorized"
 
+# --- Helper function to call the categorization LLM using Vertex AI SDK ---
+def get_categories_from_llm_vertex(descriptions: Sequence[str]) -> List[Optional[str]]:
+    """
+    Categorizes several transaction descriptions with one Vertex AI call. The
+    model must answer with a JSON list of {index, category} (enforced by a
+    response schema); every item is checked against CATEGORIES.
 
+    Returns:
+        One category per description, None where the answer had no valid
+        category for it.
+
+    Raises:
+        Whatever the Vertex AI call raises; the caller decides how to retry.
+    """
+    numbered = "\n".join(f"{i}: {json.dumps(d, ensure_ascii=False)}" for i, d in enumerate(descriptions))
     prompt = f"""
-    Analyze the following bank transaction description and categorize it into exactly ONE of the following categories.
+    Analyze each of the following bank transaction descriptions and categorize it into exactly ONE of the following categories.
     Choose the single most appropriate category. If none fit well, choose 'Uncategorized'.
-    Respond with ONLY the category name.
+    Answer with one item per description, using the description's index.
 
     Allowed Categories:
     {', '.join(CATEGORIES)}
 
-    Transaction Description:
-    "{description}"
-
-    Category:"""
-
-    try:
-        model = GenerativeModel(CAT_MODEL_NAME)
-        # Define generation config for Vertex AI
-        generation_config = GenerationConfig(
-            temperature=0.2,
-            # max_output_tokens= # Optional: set a limit if needed, but category names are short
-        )
-        # Define safety settings for Vertex AI
-        safety_settings = {
-            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-        }
+    Transaction Descriptions (index: description):
+    {numbered}
+    """
 
+    model = GenerativeModel(CAT_MODEL_NAME)
+    generation_config = GenerationConfig(
+        temperature=0.2,
+        response_mime_type="application/json",
+        response_schema=BATCH_RESPONSE_SCHEMA,
+    )
+    with get_rate_limiter("vertex").limit(estimate_tokens(prompt, outputs=len(descriptions))):
         response = model.generate_content(
-            [prompt], # Vertex AI often takes a list of content parts
+            [prompt],
             generation_config=generation_config,
-            safety_settings=safety_settings,
-            stream=False, # Use non-streaming for this tool
+            safety_settings=SAFETY_SETTINGS,
+            stream=False,
         )
 
-        # Check response and parse text safely
-        if response.candidates and response.candidates[0].content.parts:
-            category = response.text.strip()
-            if category in CATEGORIES:
-                logger.debug(f"Categorized '{description}' as '{category}' (Vertex)")
-                return category
-            else:
-                logger.warning(f"Vertex LLM returned unexpected category '{category}' for '{description}'. Defaulting to Uncategorized.")
-                return "Uncategorized"
+    categories: List[Optional[str]] = [None] * len(descriptions)
+    if not (response.candidates and response.candidates[0].content.parts):
+        logger.warning(f"Vertex LLM returned no valid text for a batch of {len(descriptions)} descriptions. Response: {response}")
+        return categories
+    try:
+        items = json.loads(response.text)
+    except ValueError as e:
+        logger.warning(f"Vertex LLM returned invalid JSON for a batch of {len(descriptions)} descriptions: {e}")
+        return categories
+
+    for item in items if isinstance(items, list) else []:
+        index = item.get("index") if isinstance(item, dict) else None
+        category = item.get("category") if isinstance(item, dict) else None
+        if isinstance(index, int) and 0 <= index < len(descriptions) and category in CATEGORIES:
+            categories[index] = category
         else:
-            logger.warning(f"Vertex LLM returned no valid text for description '{description}'. Prompt: {prompt}, Response: {response}")
-            # Consider logging response.prompt_feedback or response.candidates[0].finish_reason if available
-            return "Uncategorized"
+            logger.debug(f"Ignoring invalid batch categorization item: {item}")
+    return categories
 
-    except Exception as e:
-        logger.error(f"Error calling Vertex AI categorization LLM for '{description}': {e}", exc_info=True)
-        return "Uncategorized"
+
+def _categorize_in_batches(descriptions: Sequence[str], batch_size: int) -> List[Optional[str]]:
+    """
+    Sends descriptions to Vertex AI `batch_size` at a time. Descriptions a call
+    leaves without a valid category (or all of them, if the call fails) are
+    retried in halves, down to single descriptions, so a few bad items don't
+    cost the whole batch. Calls are paced by the shared Vertex rate limiter;
+    a rate-limited batch is retried whole once the limiter's back-off is over.
+    Returns None for what still fails.
+    """
+    categories: List[Optional[str]] = [None] * len(descriptions)
+    indices = list(range(len(descriptions)))
+    queue = deque(indices[start:start + batch_size] for start in range(0, len(indices), max(1, batch_size)))
+    calls = throttled = 0
+    while queue:
+        batch = queue.popleft()
+        calls += 1
+        try:
+            results = get_categories_from_llm_vertex([descriptions[i] for i in batch])
+        except THROTTLE_ERRORS as e:
+            if throttled < MAX_THROTTLED_RETRIES:
+                throttled += 1
+                queue.appendleft(batch)  # The limiter has already slowed down and paused for the retry-after
+                continue
+            logger.error(f"Vertex AI categorization still rate limited after {throttled} retries: {e}")
+            results = [None] * len(batch)
+        except Exception as e:
+            logger.error(f"Error calling Vertex AI categorization LLM for a batch of {len(batch)} descriptions: {e}", exc_info=True)
+            results = [None] * len(batch)
+
+        failed = []
+        for index, category in zip(batch, results):
+            if category is None:
+                failed.append(index)
+            else:
+                categories[index] = category
+        if failed and len(batch) > 1:
+            middle = (len(failed) + 1) // 2
+            queue.extend(part for part in (failed[:middle], failed[middle:]) if part)
+            logger.info(f"{len(failed)} of {len(batch)} descriptions in a batch were not categorized; retrying them in smaller batches.")
+        elif failed:
+            logger.warning(f"Could not categorize '{descriptions[batch[0]]}'. Defaulting to Uncategorized.")
+
+    logger.info(f"Categorized {len(descriptions)} descriptions with {calls} Vertex AI calls (batch size {batch_size}); "
+                f"rate limiter: {get_rate_limiter('vertex').stats()}.")
+    return categories
+
+
+def categorize_descriptions(descriptions: Sequence[str], batch_size: Optional[int] = None) -> List[str]:
+    """
+    Categorizes transaction descriptions, each merchant once.
+
+    Descriptions are grouped by merchant_key; every group is answered from
+    the category cache or, for merchants not seen before, by one Vertex AI
+    lookup of its first description (batched, CATEGORIZATION_BATCH_SIZE per
+    call), and the answer is fanned out to the whole group. Empty
+    descriptions and merchants that could not be categorized get
+    "Uncategorized".
+    """
+    batch_size = batch_size or int(os.getenv("CATEGORIZATION_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+    keys = [merchant_key(description) if description else "" for description in descriptions]
+    representatives: Dict[str, int] = {}  # merchant key -> index of its first description
+    for index, description in enumerate(descriptions):
+        if description:
+            representatives.setdefault(keys[index], index)
+    described = sum(1 for description in descriptions if description)
+    if representatives:
+        logger.info(f"Deduplicated {described} descriptions to {len(representatives)} merchants "
+                    f"(dedup ratio {described / len(representatives):.2f}x).")
+
+    resolved: Dict[str, str] = {}
+    cache = get_category_cache()
+    if cache and representatives:
+        resolved.update(cache.get_many(representatives, TAXONOMY_VERSION))
+        logger.info(f"Category cache answered {len(resolved)} of {len(representatives)} merchants ({cache.stats()}).")
+
+    pending = [key for key in representatives if key not in resolved]
+    if pending and (not PROJECT_ID or not LOCATION):
+        logger.error("Vertex AI not initialized due to missing config. Cannot categorize.")
+    elif pending:
+        results = _categorize_in_batches([descriptions[representatives[key]] for key in pending], batch_size)
+        answered = {key: category for key, category in zip(pending, results) if category is not None}
+        resolved.update(answered)
+        if cache:
+            cache.put_many(answered, TAXONOMY_VERSION)
+
+    return [resolved.get(key, "Uncategorized") if description else "Uncategorized"
+            for key, description in zip(keys, descriptions)]
 
 
 # --- The Main Tool Function (Updated to call the Vertex helper) ---
@@ -203,48 +325,64 @@ def categorize_transactions(transactions_json: str) -> str:
              return json.dumps([])
 
         logger.info(f"Attempting to categorize {len(parsed_transactions)} transactions via Vertex AI.")
-        categorized_count = 0
-        # *** SET DELAY HERE (e.g., 3 seconds) - adjust if needed ***
-        rate_limit_delay_seconds = 10
-
-        for i, transaction in enumerate(parsed_transactions):
-            # *** ADD DELAY BEFORE EACH CALL (except the first) ***
-            if i > 0:
-                logger.debug(f"Waiting {rate_limit_delay_seconds}s before next categorization call...")
-                time.sleep(rate_limit_delay_seconds)
+        # Descriptions are collected first, then categorized once per merchant, in batches
+        described: List[Dict[str, Any]] = []
+        descriptions: List[str] = []
 
+        for transaction in parsed_transactions:
             if not isinstance(transaction, dict):
                 logger.warning(f"Skipping item, not a dictionary: {transaction}")
                 continue
 
             desc_key_found = None
             lower_keys = {k.lower(): k for k in transaction.keys()}
-            possible_keys = ["page transaction details", "description", "details", "narrative", "transaction details"]
+            possible_keys = ["description", "page transaction details", "details", "narrative", "transaction details"]
             for key in possible_keys:
                 if key in lower_keys:
                     desc_key_found = lower_keys[key]
                     break
 
             if desc_key_found:
-                description = str(transaction.get(desc_key_found, ""))
-                category = get_category_from_llm_vertex(description) # Call the helper
-                transaction['category'] = category
-                if category != "Uncategorized":
-                     categorized_count += 1
+                described.append(transaction)
+                descriptions.append(str(transaction.get(desc_key_found, "")))
             else:
                 logger.warning(f"Could not find a description key in transaction: {transaction}. Assigning Uncategorized.")
                 transaction['category'] = "Uncategorized"
 
+        categorized_count = 0
+        for transaction, category in zip(described, categorize_descriptions(descriptions)):
+            transaction['category'] = category
+            if category != "Uncategorized":
+                categorized_count += 1
 
         logger.info(f"Finished categorization. Assigned categories to {categorized_count} transactions.")
         return json.dumps(parsed_transactions, ensure_ascii=False, indent=2)
 
     except Exception as e:
-        logger.error(f"Tool Error: Unexpected error during categorization loop: {e}", exc_info=True)
+        logger.error(f"Tool Error: Unexpected error during categorization: {e}", exc_info=True)
         # Return partially categorized list if loop fails mid-way
         return json.dumps(parsed_transactions or [], ensure_ascii=False, indent=2)
 
 
-# Register the function as a FunctionTool (No change needed here)
+async def categorize_transactions_async(transactions_json: str) -> str:
+    """
+    Takes a JSON string representing a list of transactions, categorizes each
+    using Vertex AI LLM, and returns an enriched JSON string list with
+    categories added.
+
+    Args:
+        transactions_json: JSON string input from the LLM.
+
+    Returns:
+        JSON string of the transaction list with an added 'category' field for each,
+        or an empty JSON array '[]' on error.
+    """
+    # Same contract as categorize_transactions, run in a worker thread: Vertex AI
+    # calls and rate-limiter pauses never block the event loop the ADK Runner is driving.
+    return await asyncio.to_thread(categorize_transactions, transactions_json)
+
+
+# Register the functions as tools
 categorization_tool = FunctionTool(
-    func=categorize_transactions)
\ No newline at end of file
+    func=categorize_transactions)
+categorization_async_tool = FunctionTool(categorize_transactions_async)
\ No newline at end of file
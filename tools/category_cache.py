@@ -0,0 +1,181 @@
+# tools/category_cache.py
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --- Cache Configuration (env overridable) ---
+DEFAULT_CACHE_PATH = ".cache/categories.sqlite3"
+DEFAULT_TTL_DAYS = 90
+DEFAULT_MAX_ENTRIES = 200_000
+DEFAULT_MEMORY_ENTRIES = 20_000
+_SQL_CHUNK = 500  # Keeps "IN (?, ?, ...)" below SQLite's parameter limit
+
+
+class CategoryCache:
+    """
+    Persistent merchant -> category cache, so merchants seen in earlier
+    statements are not sent to the LLM again.
+
+    Entries live in SQLite, keyed by merchant key (see merchant_normalizer)
+    and taxonomy version (a changed CATEGORIES list never returns stale
+    answers), with a bounded in-memory LRU in front. Entries expire after `ttl_seconds`; past
+    `max_entries` the least recently used rows are deleted.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int, memory_entries: int):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()  # -> (category, stored_at)
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Called with the lock held.
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")  # Readers in other processes don't block writers
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS categories (
+                    taxonomy TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    used_at REAL NOT NULL,
+                    PRIMARY KEY (taxonomy, key)
+                )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS categories_used_at ON categories (used_at)")
+            self._db.commit()
+        return self._db
+
+    def _remember(self, memory_key: Tuple[str, str], category: str, stored_at: float) -> None:
+        # Called with the lock held.
+        self._memory[memory_key] = (category, stored_at)
+        self._memory.move_to_end(memory_key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: Iterable[str], taxonomy: str) -> Dict[str, str]:
+        """Returns the cached category of every key that has a live entry."""
+        now = time.time()
+        found: Dict[str, str] = {}
+        with self._lock:
+            missing: List[str] = []
+            for key in dict.fromkeys(keys):
+                entry = self._memory.get((taxonomy, key))
+                if entry is not None and now - entry[1] <= self.ttl_seconds:
+                    self._memory.move_to_end((taxonomy, key))
+                    found[key] = entry[0]
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+            loaded: Dict[str, str] = {}
+            if missing:
+                try:
+                    loaded = self._load(missing, taxonomy, now)
+                except sqlite3.Error as e:
+                    logger.warning(f"Category cache: lookup failed in {self.path}: {e}")
+            found.update(loaded)
+            self.hits += len(found)
+            self.misses += len(missing) - len(loaded)
+        return found
+
+    def _load(self, keys: List[str], taxonomy: str, now: float) -> Dict[str, str]:
+        # Called with the lock held.
+        db = self._connect()
+        found: Dict[str, str] = {}
+        for start in range(0, len(keys), _SQL_CHUNK):
+            chunk = keys[start:start + _SQL_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows = db.execute(f"SELECT key, category, stored_at FROM categories WHERE taxonomy = ? AND key IN ({marks})",
+                              [taxonomy, *chunk]).fetchall()
+            live = []
+            for key, category, stored_at in rows:
+                if now - stored_at > self.ttl_seconds:
+                    self.expired += 1
+                    continue
+                found[key] = category
+                live.append(key)
+                self._remember((taxonomy, key), category, stored_at)
+            if live:
+                db.execute(f"UPDATE categories SET used_at = ? WHERE taxonomy = ? AND key IN ({','.join('?' * len(live))})",
+                           [now, taxonomy, *live])
+        db.commit()
+        return found
+
+    def put_many(self, categories: Mapping[str, str], taxonomy: str) -> None:
+        """Stores key -> category answers and evicts past the size bound."""
+        if not categories:
+            return
+        now = time.time()
+        with self._lock:
+            for key, category in categories.items():
+                self._remember((taxonomy, key), category, now)
+            try:
+                db = self._connect()
+                db.executemany("INSERT OR REPLACE INTO categories VALUES (?, ?, ?, ?, ?)",
+                               [(taxonomy, key, category, now, now) for key, category in categories.items()])
+                db.execute("DELETE FROM categories WHERE stored_at < ?", (now - self.ttl_seconds,))
+                excess = db.execute("SELECT COUNT(*) FROM categories").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    db.execute("DELETE FROM categories WHERE rowid IN "
+                               "(SELECT rowid FROM categories ORDER BY used_at LIMIT ?)", (excess,))
+                    self.evictions += excess
+                db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Category cache: failed to store {len(categories)} entries in {self.path}: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit/miss counters and the in-memory footprint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+            }
+
+
+_cache: Optional[CategoryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_category_cache() -> Optional[CategoryCache]:
+    """
+    Returns the process-wide category cache, or None when disabled via
+    CATEGORY_CACHE_ENABLED=false.
+    """
+    global _cache
+    if os.getenv("CATEGORY_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            path = os.getenv("CATEGORY_CACHE_PATH", DEFAULT_CACHE_PATH)
+            ttl_days = float(os.getenv("CATEGORY_CACHE_TTL_DAYS", DEFAULT_TTL_DAYS))
+            _cache = CategoryCache(
+                path,
+                ttl_seconds=ttl_days * 86400,
+                max_entries=int(os.getenv("CATEGORY_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                memory_entries=int(os.getenv("CATEGORY_CACHE_MEMORY_ENTRIES", DEFAULT_MEMORY_ENTRIES)),
+            )
+            logger.info(f"Category cache enabled at '{path}' (TTL {ttl_days:g} days).")
+        return _cache
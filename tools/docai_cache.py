@@ -0,0 +1,155 @@
+# tools/docai_cache.py
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- Cache Configuration (env overridable) ---
+DEFAULT_CACHE_DIR = ".cache/docai"
+DEFAULT_CACHE_MAX_MB = 512
+
+
+class DocumentCache:
+    """
+    Content-addressed on-disk cache for serialized Document AI responses.
+
+    Entries are keyed by the SHA-256 of the PDF bytes plus the processor
+    resource name (which includes the processor version when one is pinned),
+    so a changed file or a different processor never returns a stale result.
+    The total size on disk is bounded; the least recently used entries are
+    evicted first. File mtimes double as the LRU clock so the order survives
+    restarts.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._total_bytes = 0
+        self._loaded = False
+
+    @staticmethod
+    def key_for(pdf_bytes: bytes, processor_name: str) -> str:
+        """Builds the cache key for a PDF processed by a given processor."""
+        digest = hashlib.sha256(pdf_bytes)
+        digest.update(b"\0")
+        digest.update(processor_name.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pb"
+
+    def _load_index(self) -> None:
+        # Called with the lock held. Rebuilds the LRU order from the files on disk.
+        if self._loaded:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".pb"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-3], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._loaded = True
+        logger.debug(f"Document cache index loaded: {len(self._entries)} entries, {self._total_bytes} bytes in {self.cache_dir}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the cached serialized document, or None on a miss."""
+        with self._lock:
+            self._load_index()
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                data = path.read_bytes()
+                os.utime(path)  # Refresh the LRU timestamp
+            except OSError as e:
+                logger.warning(f"Document cache entry {key} unreadable, dropping it: {e}")
+                self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Stores a serialized document and evicts old entries past the size bound."""
+        if len(data) > self.max_bytes:
+            logger.debug(f"Document cache: entry {key} ({len(data)} bytes) exceeds cache size, not stored.")
+            return
+        with self._lock:
+            self._load_index()
+            path = self._path(key)
+            tmp_path = path.with_suffix(f".tmp{threading.get_ident()}")
+            try:
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)  # Atomic so readers never see partial files
+            except OSError as e:
+                logger.warning(f"Document cache: failed to write entry {key}: {e}")
+                tmp_path.unlink(missing_ok=True)
+                return
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        # Called with the lock held.
+        while self._total_bytes > self.max_bytes and self._entries:
+            old_key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                self._path(old_key).unlink()
+            except OSError as e:
+                logger.warning(f"Document cache: failed to evict entry {old_key}: {e}")
+            logger.debug(f"Document cache: evicted {old_key} ({size} bytes)")
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit/miss counters and the current cache footprint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache: Optional[DocumentCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_document_cache() -> Optional[DocumentCache]:
+    """
+    Returns the process-wide document cache, or None when caching is disabled
+    via DOCAI_CACHE_ENABLED=false.
+    """
+    global _cache
+    if os.getenv("DOCAI_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            cache_dir = os.getenv("DOCAI_CACHE_DIR", DEFAULT_CACHE_DIR)
+            max_mb = float(os.getenv("DOCAI_CACHE_MAX_MB", DEFAULT_CACHE_MAX_MB))
+            _cache = DocumentCache(cache_dir, int(max_mb * 1024 * 1024))
+            logger.info(f"Document AI response cache enabled at '{cache_dir}' (max {max_mb} MB).")
+        return _cache
@@ -0,0 +1,115 @@
+# tools/docai_client.py
+
+import os
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Dict, List, Tuple
+
+from google.cloud import documentai_v1 as documentai
+from google.cloud.documentai_v1.services.document_processor_service.transports import (
+    DocumentProcessorServiceGrpcAsyncIOTransport,
+    DocumentProcessorServiceGrpcTransport,
+)
+
+logger = logging.getLogger(__name__)
+
+# --- Channel Configuration (env overridable) ---
+DEFAULT_KEEPALIVE_MS = 30000  # Ping idle channels so load balancers don't drop them
+DEFAULT_KEEPALIVE_TIMEOUT_MS = 10000
+DEFAULT_MAX_MESSAGE_MB = 64  # Large scanned statements produce big responses
+
+_clients: Dict[str, documentai.DocumentProcessorServiceClient] = {}
+_clients_lock = threading.Lock()
+# grpc.aio channels are bound to the event loop they were created on, so async
+# clients are pooled per loop (and dropped together with it).
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, documentai.DocumentProcessorServiceAsyncClient]]" = weakref.WeakKeyDictionary()
+
+
+def get_endpoint(location: str) -> str:
+    """Returns the regional Document AI API endpoint for a location."""
+    return f"{location}-documentai.googleapis.com"
+
+
+def get_channel_options() -> List[Tuple[str, int]]:
+    """Builds the gRPC channel options from the environment."""
+    keepalive_ms = int(os.getenv("DOCAI_GRPC_KEEPALIVE_MS", DEFAULT_KEEPALIVE_MS))
+    keepalive_timeout_ms = int(os.getenv("DOCAI_GRPC_KEEPALIVE_TIMEOUT_MS", DEFAULT_KEEPALIVE_TIMEOUT_MS))
+    max_message_bytes = int(float(os.getenv("DOCAI_GRPC_MAX_MESSAGE_MB", DEFAULT_MAX_MESSAGE_MB)) * 1024 * 1024)
+    return [
+        ("grpc.keepalive_time_ms", keepalive_ms),
+        ("grpc.keepalive_timeout_ms", keepalive_timeout_ms),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.max_send_message_length", max_message_bytes),
+        ("grpc.max_receive_message_length", max_message_bytes),
+    ]
+
+
+def _make_channel_factory(transport_cls, options: List[Tuple[str, int]]):
+    """
+    Wraps the transport's own create_channel so credentials, scopes and TLS
+    are still resolved by the library, only with our channel options.
+    """
+    def create_channel(host, **kwargs):
+        kwargs["options"] = options
+        return transport_cls.create_channel(host, **kwargs)
+    return create_channel
+
+
+def get_client(location: str) -> documentai.DocumentProcessorServiceClient:
+    """
+    Returns the process-wide Document AI client for a location, creating it
+    (and its gRPC channel) on first use. The client is thread-safe, so every
+    caller in the process shares one warm channel per endpoint.
+    """
+    endpoint = get_endpoint(location)
+    client = _clients.get(endpoint)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(endpoint)
+        if client is None:
+            options = get_channel_options()
+            transport = DocumentProcessorServiceGrpcTransport(
+                host=endpoint,
+                channel=_make_channel_factory(DocumentProcessorServiceGrpcTransport, options),
+            )
+            client = documentai.DocumentProcessorServiceClient(transport=transport)
+            _clients[endpoint] = client
+            logger.info(f"Created pooled Document AI client for {endpoint} (options: {options})")
+        return client
+
+
+def get_async_client(location: str) -> documentai.DocumentProcessorServiceAsyncClient:
+    """
+    Returns the Document AI async client for a location on the running event
+    loop, creating it on first use. Must be called from inside a coroutine.
+    """
+    endpoint = get_endpoint(location)
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        client = loop_clients.get(endpoint)
+        if client is None:
+            options = get_channel_options()
+            transport = DocumentProcessorServiceGrpcAsyncIOTransport(
+                host=endpoint,
+                channel=_make_channel_factory(DocumentProcessorServiceGrpcAsyncIOTransport, options),
+            )
+            client = documentai.DocumentProcessorServiceAsyncClient(transport=transport)
+            loop_clients[endpoint] = client
+            logger.info(f"Created pooled async Document AI client for {endpoint} (options: {options})")
+        return client
+
+
+def close_clients() -> None:
+    """Closes all pooled sync clients. Mainly useful for tests and clean shutdown."""
+    with _clients_lock:
+        for endpoint, client in _clients.items():
+            try:
+                client.transport.close()
+            except Exception as e:
+                logger.warning(f"Failed to close Document AI client for {endpoint}: {e}")
+        _clients.clear()
@@ -0,0 +1,305 @@
+# tools/extractors.py
+
+import io
+import os
+import re
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Collection, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pdfplumber
+from google.api_core import exceptions as api_exceptions
+
+from tools.header_classifier import get_header_classifier, is_transaction_layout
+from tools.pdf_preflight import PreflightReport
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXTRACTORS = "native,ocr"
+# A page with less text than this has no usable text layer (scanned image)
+DEFAULT_MIN_TEXT_CHARS = 40
+
+_WHITESPACE = re.compile(r"\s+")
+# A backend that raises one of these (missing config, quota, outage) is
+# unavailable; pages an earlier backend already read are still returned.
+BACKEND_UNAVAILABLE_ERRORS = (RuntimeError, api_exceptions.GoogleAPICallError)
+
+
+# --- Common table/page model shared by all backends ---
+class StatementTable:
+    """A table found on a page: header cell texts plus body rows of cell texts."""
+
+    __slots__ = ("table_number", "headers", "rows")
+
+    def __init__(self, table_number: int, headers: List[str], rows: List[List[str]]):
+        self.table_number = table_number
+        self.headers = headers  # Empty when the backend found no header row
+        self.rows = rows
+
+
+class StatementPage:
+    """
+    One page of a statement as extracted by a backend.
+
+    `index` is the 0-based page index in the original PDF, whatever subset
+    of pages the backend was given. `usable` is False when the backend could
+    not read the page (e.g. no text layer) and another backend should try.
+    """
+
+    __slots__ = ("index", "text", "tables", "backend", "usable")
+
+    def __init__(self, index: int, text: str, tables: List[StatementTable], backend: str, usable: bool = True):
+        self.index = index
+        self.text = text
+        self.tables = tables
+        self.backend = backend
+        self.usable = usable
+
+
+class Extractor:
+    """
+    Base class for extraction backends. Subclasses implement iter_pages; the
+    async variant runs it in a worker thread unless overridden.
+    """
+
+    name = "base"
+
+    def iter_pages(self, pdf_bytes: bytes, page_indices: Sequence[int], source: str = "document") -> Iterator[StatementPage]:
+        """
+        Yields the given pages (0-based indices, ascending) in page order.
+        `source` labels the statement in logs and stored responses.
+        """
+        raise NotImplementedError
+
+    async def extract_pages_async(self, pdf_bytes: bytes, page_indices: Sequence[int],
+                                  source: str = "document") -> List[StatementPage]:
+        return await asyncio.to_thread(lambda: list(self.iter_pages(pdf_bytes, page_indices, source)))
+
+    def accepts_page(self, report: PreflightReport, index: int) -> bool:
+        """Whether the pre-flight report says this backend can read the page at all."""
+        return True
+
+
+# --- Native text-layer backend ---
+# pdfplumber's default strategy needs ruling lines; many statements only align
+# columns with whitespace, so fall back to text-alignment detection.
+_TEXT_TABLE_SETTINGS = {"vertical_strategy": "text", "horizontal_strategy": "text"}
+
+
+def _clean_cell(value: Optional[str]) -> str:
+    return _WHITESPACE.sub(" ", value or "").strip()
+
+
+def _column_edges(table) -> List[float]:
+    """x positions of a pdfplumber table's column boundaries, left to right."""
+    return [column.bbox[0] for column in table.columns] + [table.bbox[2]]
+
+
+def _merge_columns(row: List[str], merged: List[int]) -> List[str]:
+    """Appends each cell in a `merged` column to the cell on its left."""
+    if not merged:
+        return row
+    result: List[str] = []
+    for index, cell in enumerate(row):
+        if index in merged:
+            if cell:
+                result[-1] = f"{result[-1]} {cell}" if result[-1] else cell
+        else:
+            result.append(cell)
+    return result
+
+
+class NativeTextExtractor(Extractor):
+    """
+    Reads tables straight from a born-digital PDF's text layer with
+    pdfplumber: no network call, no OCR. Pages with (almost) no text are
+    marked unusable so an OCR backend can take them.
+    """
+
+    name = "native"
+
+    def __init__(self, min_text_chars: int = DEFAULT_MIN_TEXT_CHARS):
+        self.min_text_chars = min_text_chars
+
+    def accepts_page(self, report: PreflightReport, index: int) -> bool:
+        return report.text_pages[index]  # Image-only pages have no text layer to read
+
+    def _to_table(self, table_number: int, raw_rows: List[List[Optional[str]]]) -> Tuple[StatementTable, Optional[List[int]]]:
+        """
+        Returns the table and, if a row of it classified as a transaction
+        header, the indices of the columns that were merged into their left
+        neighbour (else None).
+        """
+        rows = [[_clean_cell(cell) for cell in row] for row in raw_rows]
+        rows = [row for row in rows if any(row)]
+        if not rows:
+            return StatementTable(table_number, [], []), None
+        # Text-aligned tables often start with page furniture; the header is
+        # the first row that classifies as a transaction header (else row 0).
+        classified = get_header_classifier().classify_many(rows)
+        header_index = next((i for i, roles in enumerate(classified) if is_transaction_layout(roles)), None)
+        if header_index is None:
+            return StatementTable(table_number, rows[0], rows[1:]), None
+        # The text strategy splits multi-word cells ("MERCHANT NUMBER 1") into
+        # columns without a header of their own; fold those back to the left.
+        header = rows[header_index]
+        merged = [i for i in range(1, len(header)) if not header[i]]
+        rows = [_merge_columns(row, merged) for row in rows[header_index:]]
+        return StatementTable(table_number, rows[0], rows[1:]), merged
+
+    def iter_pages(self, pdf_bytes: bytes, page_indices: Sequence[int], source: str = "document") -> Iterator[StatementPage]:
+        # Column edges of the last transaction table: a continuation on the next
+        # page has no header for the text strategy to align its columns on
+        carried_edges: Optional[List[float]] = None
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+            for index in page_indices:
+                page = pdf.pages[index]
+                text = page.extract_text() or ""
+                if len(text.strip()) < self.min_text_chars:
+                    logger.debug(f"Native extractor: page {index + 1} has no usable text layer.")
+                    result = StatementPage(index, text, [], self.name, usable=False)
+                else:
+                    found = page.find_tables() or page.find_tables(_TEXT_TABLE_SETTINGS)
+                    converted = [self._to_table(n, table.extract()) for n, table in enumerate(found)]
+                    edges = next(([edge for i, edge in enumerate(_column_edges(table)) if i not in merged]
+                                  for table, (_, merged) in zip(found, converted) if merged is not None), None)
+                    if edges:
+                        carried_edges = edges
+                    elif carried_edges and (words := page.extract_words()):
+                        # Outer lines must lie within this page's text, or the text
+                        # strategy's row edges don't reach them and the column is dropped
+                        lines = ([min(w["x0"] for w in words)] + carried_edges[1:-1]
+                                 + [max(w["x1"] for w in words)])
+                        settings = dict(_TEXT_TABLE_SETTINGS, vertical_strategy="explicit", explicit_vertical_lines=lines)
+                        converted = [self._to_table(n, raw) for n, raw in enumerate(page.extract_tables(settings))] or converted
+                    result = StatementPage(index, text, [table for table, _ in converted], self.name)
+                page.close()  # Drop pdfplumber's per-page object cache
+                yield result
+
+
+# --- Backend registry and routing ---
+_EXTRACTORS: Dict[str, Callable[[], Extractor]] = {"native": NativeTextExtractor}
+
+
+def register_extractor(name: str, factory: Callable[[], Extractor]) -> None:
+    """Makes a backend available to STATEMENT_EXTRACTORS under `name`."""
+    _EXTRACTORS[name] = factory
+
+
+def get_extractors() -> List[Extractor]:
+    """
+    Builds the backend cascade from STATEMENT_EXTRACTORS (comma-separated,
+    default "native,ocr"): a backend that found a transaction table keeps
+    every page it could read; otherwise all its pages go to the next backend.
+    The last backend's result is final.
+    """
+    names = [n.strip() for n in os.getenv("STATEMENT_EXTRACTORS", DEFAULT_EXTRACTORS).split(",") if n.strip()]
+    unknown = [n for n in names if n not in _EXTRACTORS]
+    if unknown or not names:
+        raise ValueError(f"Unknown extractor(s) {unknown} in STATEMENT_EXTRACTORS. Known: {', '.join(_EXTRACTORS)}")
+    return [_EXTRACTORS[n]() for n in names]
+
+
+def _route(pages: List[StatementPage], pending: List[int],
+           has_transaction_table: Callable[[StatementPage], bool]):
+    """
+    Decides which pages of a non-final backend are kept. If it found a
+    transaction table anywhere, it keeps every page it could read: its other
+    text pages (cover, summary, terms) have no transactions for OCR to find
+    either. Otherwise none are kept. Unreadable pages always go on.
+
+    Returns:
+        (accepted pages, still pending page indices)
+    """
+    readable = [p for p in pages if p.usable]
+    found = [has_transaction_table(p) for p in readable]  # Every page, in order: the predicate carries headers
+    accepted = readable if any(found) else []
+    accepted_indices = {p.index for p in accepted}
+    return accepted, [i for i in pending if i not in accepted_indices]
+
+
+def _candidates(extractor: Extractor, pending: List[int], report: Optional[PreflightReport]) -> List[int]:
+    if report is None:
+        return pending
+    return [i for i in pending if extractor.accepts_page(report, i)]
+
+
+def _log_skipped(extractor: Extractor, error: Exception, skipped: List[int], source: str) -> None:
+    logger.warning(f"Extractor '{extractor.name}' unavailable for {source} ({type(error).__name__}: {error}); "
+                   f"returning the pages already read and skipping pages {[i + 1 for i in skipped]}.")
+
+
+def iter_statement_pages(pdf_bytes: bytes, page_count: int, extractors: Sequence[Extractor],
+                         has_transaction_table: Callable[[StatementPage], bool],
+                         report: Optional[PreflightReport] = None,
+                         skip_pages: Collection[int] = (), source: str = "document") -> Iterator[StatementPage]:
+    """
+    Runs the backend cascade and yields every page in page order, except
+    `skip_pages` (known boilerplate), which no backend sees. The last backend
+    is streamed, so its pages come out as soon as they are decoded. With a
+    pre-flight report, non-final backends never see pages they can't read
+    (e.g. scanned pages skip the native text backend). If the last backend
+    is unavailable but earlier ones already read pages, those are returned
+    and the rest is logged as skipped.
+    """
+    pending = [i for i in range(page_count) if i not in skip_pages]
+    accepted: List[StatementPage] = []
+    for position, extractor in enumerate(extractors):
+        if not pending:
+            break
+        if position == len(extractors) - 1:
+            queue = deque(sorted(accepted, key=lambda p: p.index))
+            done = set()
+            try:
+                for page in extractor.iter_pages(pdf_bytes, pending, source):
+                    while queue and queue[0].index < page.index:
+                        yield queue.popleft()
+                    done.add(page.index)
+                    yield page
+            except BACKEND_UNAVAILABLE_ERRORS as e:
+                if not accepted:
+                    raise
+                _log_skipped(extractor, e, [i for i in pending if i not in done], source)
+            yield from queue
+            return
+
+        candidates = _candidates(extractor, pending, report)
+        if not candidates:
+            continue
+        pages = list(extractor.iter_pages(pdf_bytes, candidates, source))
+        kept, pending = _route(pages, pending, has_transaction_table)
+        accepted.extend(kept)
+        logger.info(f"Extractor '{extractor.name}' handled {len(kept)} pages; {len(pending)} left for the next backend.")
+
+    yield from sorted(accepted, key=lambda p: p.index)
+
+
+async def extract_statement_pages_async(pdf_bytes: bytes, page_count: int, extractors: Sequence[Extractor],
+                                        has_transaction_table: Callable[[StatementPage], bool],
+                                        report: Optional[PreflightReport] = None,
+                                        skip_pages: Collection[int] = (),
+                                        source: str = "document") -> List[StatementPage]:
+    """Async variant of iter_statement_pages; returns all pages in page order."""
+    pending = [i for i in range(page_count) if i not in skip_pages]
+    accepted: List[StatementPage] = []
+    for position, extractor in enumerate(extractors):
+        if not pending:
+            break
+        if position == len(extractors) - 1:
+            try:
+                accepted.extend(await extractor.extract_pages_async(pdf_bytes, pending, source))
+            except BACKEND_UNAVAILABLE_ERRORS as e:
+                if not accepted:
+                    raise
+                _log_skipped(extractor, e, pending, source)
+            break
+        candidates = _candidates(extractor, pending, report)
+        if not candidates:
+            continue
+        pages = await extractor.extract_pages_async(pdf_bytes, candidates, source)
+        # The predicate classifies tables and may save the layout registry
+        kept, pending = await asyncio.to_thread(_route, pages, pending, has_transaction_table)
+        accepted.extend(kept)
+        logger.info(f"Extractor '{extractor.name}' handled {len(kept)} pages; {len(pending)} left for the next backend.")
+    return sorted(accepted, key=lambda p: p.index)
@@ -0,0 +1,179 @@
+# tools/header_classifier.py
+
+import os
+import re
+import bisect
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Column roles a transaction table can resolve to, in priority order: when a
+# header matches several roles (e.g. "Debit Amount"), the earlier role wins.
+COLUMN_ROLES = ("date", "description", "debit", "credit", "amount", "balance")
+
+# Header keywords per locale (lowercase). Matching is by substring, like the
+# original keyword heuristic, so "Transaction Date" and "Posting date" match "date".
+HEADER_KEYWORDS: Dict[str, Dict[str, List[str]]] = {
+    "en": {
+        "date": ["transaction date", "posting date", "value date", "date"],
+        "description": ["transaction details", "description", "details", "narrative", "particulars"],
+        "debit": ["debit", "withdrawal", "paid out", "money out"],
+        "credit": ["credit", "deposit", "paid in", "money in"],
+        "amount": ["amount"],
+        "balance": ["balance"],
+    },
+    "de": {
+        "date": ["buchungsdatum", "buchungstag", "wertstellung", "valuta", "datum"],
+        "description": ["verwendungszweck", "buchungstext", "beschreibung", "vorgang"],
+        "debit": ["lastschrift", "belastung", "soll"],
+        "credit": ["gutschrift", "haben"],
+        "amount": ["betrag", "umsatz"],
+        "balance": ["kontostand", "saldo"],
+    },
+    "fr": {
+        "date": ["date d'opération", "date de valeur", "date"],
+        "description": ["libellé", "libelle", "désignation", "opération"],
+        "debit": ["débit", "debit"],
+        "credit": ["crédit", "credit"],
+        "amount": ["montant"],
+        "balance": ["solde"],
+    },
+    "es": {
+        "date": ["fecha"],
+        "description": ["concepto", "descripción", "descripcion", "detalle"],
+        "debit": ["cargo", "débito", "debito"],
+        "credit": ["abono", "crédito", "credito"],
+        "amount": ["importe", "monto"],
+        "balance": ["saldo"],
+    },
+}
+
+DEFAULT_LOCALES = "en"
+
+_WHITESPACE = re.compile(r"\s+")
+_SEPARATOR = "\n"  # Never part of a header: get_text folds newlines into spaces
+
+
+class HeaderClassifier:
+    """
+    Assigns column roles to table headers with one precompiled alternation
+    regex over the combined keyword set.
+
+    All headers of all tables are lowercased and scanned together in a single
+    `finditer` pass; each match is mapped back to its table/column by offset.
+    """
+
+    def __init__(self, keywords: Dict[str, Iterable[str]]):
+        self._keyword_roles: Dict[str, str] = {}
+        for role in COLUMN_ROLES:
+            for keyword in keywords.get(role, ()):
+                keyword = _WHITESPACE.sub(" ", keyword.lower()).strip()
+                existing = self._keyword_roles.setdefault(keyword, role)
+                if existing != role:
+                    logger.warning(f"Header keyword '{keyword}' maps to both '{existing}' and '{role}'; keeping '{existing}'.")
+        # Longest keywords first, so "transaction details" wins over "details"
+        alternatives = sorted(self._keyword_roles, key=len, reverse=True)
+        # Spaces match any run of whitespace except the header separator
+        self._pattern = re.compile("|".join(re.escape(kw).replace(r"\ ", r"[^\S\n]+") for kw in alternatives))
+        self._role_rank = {role: rank for rank, role in enumerate(COLUMN_ROLES)}
+        # Identifies the keyword set, so cached classifications can be invalidated
+        self.signature = hashlib.sha1(repr(sorted(self._keyword_roles.items())).encode("utf-8")).hexdigest()[:12]
+
+    @classmethod
+    def for_locales(cls, locales: Sequence[str]) -> "HeaderClassifier":
+        """Builds a classifier from the combined keyword sets of several locales."""
+        combined: Dict[str, List[str]] = {role: [] for role in COLUMN_ROLES}
+        for locale in locales:
+            if locale not in HEADER_KEYWORDS:
+                raise ValueError(f"Unknown header locale '{locale}'. Known: {', '.join(HEADER_KEYWORDS)}")
+            for role, keywords in HEADER_KEYWORDS[locale].items():
+                combined[role].extend(keywords)
+        return cls(combined)
+
+    def classify_many(self, header_lists: Sequence[Sequence[str]]) -> List[Dict[str, int]]:
+        """
+        Returns the column roles (role -> column index) for each header list.
+        Each role goes to the first column that matches it, and each column
+        gets at most one role. A single column for both directions ("Debit/
+        Credit", "Amount (Debit/Credit)") is a signed `amount` column.
+        """
+        starts: List[int] = []  # Offset of every header in the joined text
+        owners: List[tuple] = []  # (table index, column index) for each header
+        lowered: List[str] = []
+        offset = 0
+        for table_index, headers in enumerate(header_lists):
+            for column_index, header in enumerate(headers):
+                header = header.lower()  # Per header: lower() can change a string's length
+                starts.append(offset)
+                owners.append((table_index, column_index))
+                lowered.append(header)
+                offset += len(header) + 1
+        text = _SEPARATOR.join(lowered)
+
+        # Candidate roles per (table, column), as sorted role ranks
+        candidates: Dict[tuple, List[int]] = {}
+        for match in self._pattern.finditer(text):
+            owner = owners[bisect.bisect_right(starts, match.start()) - 1]
+            role = self._keyword_roles[_WHITESPACE.sub(" ", match.group())]
+            candidates.setdefault(owner, []).append(self._role_rank[role])
+
+        _resolve_signed_columns(candidates, self._role_rank)
+        results: List[Dict[str, int]] = [{} for _ in header_lists]
+        for (table_index, column_index) in sorted(candidates):
+            roles = results[table_index]
+            for rank in sorted(candidates[(table_index, column_index)]):
+                role = COLUMN_ROLES[rank]
+                if role not in roles:
+                    roles[role] = column_index
+                    break
+        return results
+
+    def classify(self, headers: Sequence[str]) -> Dict[str, int]:
+        """Returns the column roles for one table's headers."""
+        return self.classify_many([headers])[0]
+
+
+def _resolve_signed_columns(candidates: Dict[tuple, List[int]], role_rank: Dict[str, int]) -> None:
+    """
+    Turns debit/credit candidates into `amount` for columns that hold both
+    directions: they match both debit and credit, or amount and one of them
+    while no other column of the table has the opposite direction ("Debit
+    Amount" next to "Credit Amount" stays split).
+    """
+    debit, credit, amount = role_rank["debit"], role_rank["credit"], role_rank["amount"]
+    for (table_index, column_index), ranks in candidates.items():
+        matched = set(ranks)
+        both = debit in matched and credit in matched
+        one_sided = amount in matched and len(matched & {debit, credit}) == 1
+        if one_sided:
+            opposite = credit if debit in matched else debit
+            one_sided = not any(opposite in other for (t, c), other in candidates.items()
+                                if t == table_index and c != column_index)
+        if both or one_sided:
+            candidates[(table_index, column_index)] = sorted((matched - {debit, credit}) | {amount})
+
+
+def is_transaction_layout(roles: Dict[str, int]) -> bool:
+    """A transaction table needs a date, a description and some amount column."""
+    return "date" in roles and "description" in roles and any(r in roles for r in ("amount", "debit", "credit"))
+
+
+_classifier: Optional[HeaderClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_header_classifier() -> HeaderClassifier:
+    """
+    Returns the process-wide classifier for the locales in BANK_HEADER_LOCALES
+    (comma-separated, default "en").
+    """
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            locales = [l.strip() for l in os.getenv("BANK_HEADER_LOCALES", DEFAULT_LOCALES).split(",") if l.strip()]
+            _classifier = HeaderClassifier.for_locales(locales)
+            logger.info(f"Header classifier built for locales {locales}.")
+        return _classifier
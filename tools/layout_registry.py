@@ -0,0 +1,185 @@
+# tools/layout_registry.py
+
+import os
+import re
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from tools.header_classifier import get_header_classifier
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_PATH = ".cache/bank_layouts.json"
+# Bump whenever the header heuristics change, so layouts resolved (or
+# rejected) by an older heuristic are re-evaluated instead of trusted. The
+# classifier's keyword signature is part of the version too, so changing
+# BANK_HEADER_LOCALES also starts a fresh registry.
+HEURISTIC_VERSION = 3
+# Bound on remembered layouts (BANK_LAYOUT_REGISTRY_MAX_LAYOUTS); the oldest
+# are dropped first. Applies separately to the persisted transaction layouts
+# and to the in-memory set of rejected ones.
+DEFAULT_MAX_LAYOUTS = 2000
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_header(header: str) -> str:
+    return _WHITESPACE.sub(" ", header.lower()).strip()
+
+
+def fingerprint(headers: List[str]) -> str:
+    """Returns a stable signature for a table's header row."""
+    signature = "\x1f".join(normalize_header(h) for h in headers)
+    return hashlib.sha1(signature.encode("utf-8")).hexdigest()
+
+
+class LayoutRegistry:
+    """
+    Persistent map from header fingerprints to resolved column roles.
+
+    Known layouts - including tables already known *not* to be transaction
+    tables - resolve with one dict lookup; the header classifier only runs the
+    first time a layout is seen. Transaction layouts are saved as JSON whenever
+    a new one is learned, so they carry over between runs. Rejected layouts
+    are only remembered in memory, by fingerprint: their "headers" are often
+    a statement's first data row, which must not end up on disk.
+    """
+
+    def __init__(self, path: str, version: str = str(HEURISTIC_VERSION), max_layouts: int = DEFAULT_MAX_LAYOUTS):
+        self.path = Path(path)
+        self.version = version
+        self.max_layouts = max_layouts
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # Serializes writers; taken before _lock, never inside it
+        self._layouts: "Optional[OrderedDict[str, dict]]" = None
+        self._rejected: "OrderedDict[str, None]" = OrderedDict()
+        self._dirty = False
+        self.persist = True  # False: learn in memory only (e.g. in reparse worker processes)
+
+    def _load(self) -> Dict[str, dict]:
+        # Called with the lock held.
+        if self._layouts is None:
+            self._layouts = OrderedDict()
+            if self.path.is_file():
+                try:
+                    data = json.loads(self.path.read_text(encoding="utf-8"))
+                    if data.get("version") == self.version:
+                        # Older registries also stored rejected layouts (with their headers); drop them.
+                        self._layouts.update((key, entry) for key, entry in data["layouts"].items() if entry.get("roles"))
+                        self._dirty = len(self._layouts) != len(data["layouts"])
+                        logger.debug(f"Loaded {len(self._layouts)} bank layouts from {self.path}")
+                    else:
+                        logger.info(f"Layout registry {self.path} was built by another heuristic version, starting empty.")
+                except (OSError, ValueError, KeyError, AttributeError) as e:
+                    logger.warning(f"Could not read layout registry {self.path}, starting empty: {e}")
+        return self._layouts
+
+    @staticmethod
+    def _trim(entries: OrderedDict, limit: int) -> None:
+        while len(entries) > limit:
+            entries.popitem(last=False)
+
+    def _save(self) -> None:
+        # Snapshot under the lock, write outside it, so lookups never wait on disk.
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty or not self.persist:
+                    return
+                data = {"version": self.version, "layouts": dict(self._layouts)}
+                self._dirty = False
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # Unique per writer, so processes sharing the registry never write the same temp file
+                fd, tmp_name = tempfile.mkstemp(prefix=f"{self.path.name}.", suffix=".tmp", dir=self.path.parent)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=1, ensure_ascii=False)
+                os.replace(tmp_name, self.path)
+            except OSError as e:
+                logger.warning(f"Could not save layout registry {self.path}: {e}")
+
+    def resolve_many(
+        self,
+        header_lists: Sequence[List[str]],
+        classify_many: Callable[[Sequence[List[str]]], List[Optional[Dict[str, int]]]],
+    ) -> List[Optional[Dict[str, int]]]:
+        """
+        Returns the column roles for each table's headers, or None for layouts
+        that are not transaction tables. `classify_many` is called once, with
+        only the layouts that haven't been seen before.
+        """
+        keys = [fingerprint(headers) for headers in header_lists]
+        results: List[Optional[Dict[str, int]]] = [None] * len(keys)
+        learned = []
+        with self._lock:
+            layouts = self._load()
+            unseen: Dict[str, List[int]] = {}
+            for index, key in enumerate(keys):
+                entry = layouts.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    results[index] = entry["roles"]
+                elif key in self._rejected:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                    unseen.setdefault(key, []).append(index)
+
+            if unseen:
+                new_keys = list(unseen)
+                classified = classify_many([header_lists[unseen[key][0]] for key in new_keys])
+                for key, roles in zip(new_keys, classified):
+                    if roles:
+                        headers = header_lists[unseen[key][0]]
+                        layouts[key] = {"headers": [normalize_header(h) for h in headers], "roles": roles}
+                        self._dirty = True
+                    else:
+                        self._rejected[key] = None
+                    for index in unseen[key]:
+                        results[index] = roles
+                    learned.append((key, roles))
+                self._trim(layouts, self.max_layouts)
+                self._trim(self._rejected, self.max_layouts)
+
+        if self._dirty:
+            self._save()
+        for key, roles in learned:
+            logger.info(f"Learned new bank layout {key[:12]} ({'transactions' if roles else 'other'}): roles={roles}")
+        return results
+
+    def resolve(
+        self,
+        headers: List[str],
+        classify_many: Callable[[Sequence[List[str]]], List[Optional[Dict[str, int]]]],
+    ) -> Optional[Dict[str, int]]:
+        """Single-table variant of resolve_many."""
+        return self.resolve_many([headers], classify_many)[0]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "layouts": len(self._load()), "rejected": len(self._rejected)}
+
+
+_registry: Optional[LayoutRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_layout_registry() -> LayoutRegistry:
+    """Returns the process-wide layout registry (path from BANK_LAYOUT_REGISTRY)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            version = f"{HEURISTIC_VERSION}:{get_header_classifier().signature}"
+            _registry = LayoutRegistry(
+                os.getenv("BANK_LAYOUT_REGISTRY", DEFAULT_REGISTRY_PATH),
+                version,
+                max_layouts=int(os.getenv("BANK_LAYOUT_REGISTRY_MAX_LAYOUTS", DEFAULT_MAX_LAYOUTS)),
+            )
+        return _registry
@@ -0,0 +1,139 @@
+# tools/local_ocr.py
+
+import os
+import bisect
+import logging
+import statistics
+import threading
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from tools.extractors import DEFAULT_MIN_TEXT_CHARS, Extractor, StatementPage, StatementTable
+from tools.header_classifier import get_header_classifier, is_transaction_layout
+from tools.scan_preprocess import render_pages
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OCR_DPI = 300
+DEFAULT_OCR_LANG = "eng"
+# Words further apart than this many line heights belong to different columns
+_COLUMN_GAP_LINE_HEIGHTS = 1.2
+
+# An OCR'd word: (left, top, right, bottom, text) in pixels
+Word = Tuple[int, int, int, int, str]
+
+_available: Optional[bool] = None
+_available_lock = threading.Lock()
+
+
+def tesseract_available() -> bool:
+    """
+    True if pytesseract and the tesseract binary are installed. Both are
+    optional; without them the local OCR backend is simply never chosen.
+    """
+    global _available
+    with _available_lock:
+        if _available is None:
+            try:
+                import pytesseract
+                version = pytesseract.get_tesseract_version()
+                logger.info(f"Local OCR available (tesseract {version}).")
+                _available = True
+            except Exception as e:  # ImportError, or TesseractNotFoundError when the binary is missing
+                logger.info(f"Local OCR unavailable: {e}")
+                _available = False
+        return _available
+
+
+def _group_lines(words: Sequence[Word]) -> List[List[Word]]:
+    """Groups words into text lines by vertical position, each line sorted left to right."""
+    lines: List[List[Word]] = []
+    centers: List[float] = []
+    for word in sorted(words, key=lambda w: (w[1] + w[3]) / 2):
+        center, height = (word[1] + word[3]) / 2, word[3] - word[1]
+        if lines and abs(center - centers[-1]) <= height / 2:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+            centers.append(center)
+    return [sorted(line, key=lambda w: w[0]) for line in lines]
+
+
+def _split_cells(line: List[Word], gap: float) -> List[Tuple[float, str]]:
+    """Splits a line into cells at wide horizontal gaps; returns (center x, text) per cell."""
+    cells: List[List[Word]] = [[line[0]]]
+    for word in line[1:]:
+        if word[0] - cells[-1][-1][2] > gap:
+            cells.append([word])
+        else:
+            cells[-1].append(word)
+    return [((cell[0][0] + cell[-1][2]) / 2, " ".join(w[4] for w in cell)) for cell in cells]
+
+
+def words_to_page(words: Sequence[Word], index: int, backend: str = "tesseract",
+                  min_text_chars: int = DEFAULT_MIN_TEXT_CHARS) -> StatementPage:
+    """
+    Rebuilds the page text and its transaction table from OCR'd words.
+
+    The header is the first line whose cells classify as a transaction
+    header. Every later line becomes a row, each word going to the header
+    column whose center is nearest, so right-aligned amounts and wrapped
+    descriptions still land in the right column.
+    """
+    lines = _group_lines([w for w in words if w[4].strip()])
+    text = "\n".join(" ".join(w[4] for w in line) for line in lines)
+    if len(text.strip()) < min_text_chars:
+        return StatementPage(index, text, [], backend, usable=False)
+
+    line_height = statistics.median(w[3] - w[1] for line in lines for w in line)
+    line_cells = [_split_cells(line, line_height * _COLUMN_GAP_LINE_HEIGHTS) for line in lines]
+    classified = get_header_classifier().classify_many([[t for _, t in cells] for cells in line_cells])
+    header_line = next((i for i, roles in enumerate(classified) if is_transaction_layout(roles)), None)
+    if header_line is None:
+        return StatementPage(index, text, [], backend)
+
+    header_cells = line_cells[header_line]
+    headers = [t for _, t in header_cells]
+    centers = [x for x, _ in header_cells]
+    boundaries = [(left + right) / 2 for left, right in zip(centers, centers[1:])]
+
+    rows = []
+    for line in lines[header_line + 1:]:
+        row = [[] for _ in headers]
+        for word in line:
+            row[bisect.bisect_left(boundaries, (word[0] + word[2]) / 2)].append(word[4])
+        rows.append([" ".join(cell) for cell in row])
+    return StatementPage(index, text, [StatementTable(0, headers, rows)], backend)
+
+
+class TesseractExtractor(Extractor):
+    """
+    Local OCR backend: renders pages (pypdfium2, grayscale) and reads them with
+    Tesseract, so statements can still be processed offline or while the
+    Document AI quota is exhausted. Slower and less accurate than Document AI.
+    """
+
+    name = "tesseract"
+
+    def __init__(self, dpi: Optional[int] = None, lang: Optional[str] = None):
+        self.dpi = dpi or int(os.getenv("LOCAL_OCR_DPI", DEFAULT_OCR_DPI))
+        self.lang = lang or os.getenv("LOCAL_OCR_LANG", DEFAULT_OCR_LANG)
+
+    def _ocr_words(self, image) -> List[Word]:
+        import pytesseract
+
+        # psm 6: one uniform block, so a table row stays one line across columns
+        data = pytesseract.image_to_data(image, lang=self.lang, config="--psm 6",
+                                         output_type=pytesseract.Output.DICT)
+        return [
+            (left, top, left + width, top + height, text)
+            for left, top, width, height, text, conf in zip(
+                data["left"], data["top"], data["width"], data["height"], data["text"], data["conf"])
+            if text.strip() and float(conf) >= 0
+        ]
+
+    def iter_pages(self, pdf_bytes: bytes, page_indices: Sequence[int], source: str = "document") -> Iterator[StatementPage]:
+        if not tesseract_available():
+            raise RuntimeError("Local OCR requires pytesseract and the tesseract binary.")
+        for index, image in render_pages(pdf_bytes, page_indices, self.dpi):
+            yield words_to_page(self._ocr_words(image), index, self.name)
+            logger.debug(f"Local OCR read page {index + 1}.")
@@ -0,0 +1,87 @@
+# tools/merchant_normalizer.py
+
+import os
+import re
+from functools import lru_cache
+from typing import FrozenSet
+
+# Payment processor prefixes glued to the merchant with "*": "SQ *COFFEE", "PAYPAL *NETFLIX"
+_PROCESSOR = re.compile(r"\b(?:sq|tst|pp|paypal|sumup|zettle|izettle|iz|sp|amzn mktp \w+)\s*\*")
+# Card payment wording: "CARD PAYMENT TO ...", "PURCHASE AT ..."
+_PAYMENT = re.compile(r"^(?:\s*(?:pos|card|debit card|visa|contactless)\b)*\s*(?:payment|purchase)\s+(?:to|at)\b")
+# "VISA DEBIT CARD", "CREDIT CARD" name the card, not the direction of the money
+_CARD_TYPE = re.compile(r"\b(?:debit|credit)\s+card\b")
+# "NETFLIX.COM/BILL", "www.amazon.co.uk" -> the domain's name
+_DOMAIN = re.compile(r"(?:www\.)?([a-z][a-z-]*)\.(?:com|net|org|co\.uk|co|uk|de|fr|ie|io|eu)\b\S*")
+# One pass over what's left: tokens with two or more digits (card suffixes,
+# dates, times, terminal and reference numbers) match the first branch and are
+# dropped; words need a letter, so "7-eleven" stays and lone digits go
+_TOKENS = re.compile(r"\S*\d\S*\d\S*|([a-z0-9&'+-]*[a-z][a-z0-9&'+-]*)")
+
+MAX_KEY_TOKENS = 4
+
+STOPWORDS: FrozenSet[str] = frozenset("""
+    pos visa mastercard mc maestro amex card cards contactless purchase chip pin
+    online ref reference payment pymt trx txn terminal auth dd so
+    ltd limited inc llc plc gmbh corp co company
+    store stores shop www com
+    jan feb mar apr may jun jul aug sep sept oct nov dec
+    gb gbr uk us usa ie irl de deu fr fra es esp nl
+    london manchester birmingham glasgow edinburgh leeds liverpool bristol dublin
+    new york nyc paris berlin amsterdam madrid
+""".split())
+
+# Words that say which way the money went: "TRANSFER IN" and "TRANSFER TO ..."
+# are different categories, so these always stay in the key
+DIRECTION_WORDS: FrozenSet[str] = frozenset("in to from cr dr credit debit".split())
+
+# US state codes; a trailing one (and the city before it) is dropped: "... SEATTLE WA"
+US_STATES: FrozenSet[str] = frozenset("""
+    al ak az ar ca co ct de dc fl ga hi id il in ia ks ky la me md ma mi mn ms mo mt ne nv nh nj nm
+    ny nc nd oh ok or pa ri sc sd tn tx ut vt va wa wv wi wy
+""".split())
+
+
+def _stopwords() -> FrozenSet[str]:
+    extra = os.getenv("MERCHANT_STOPWORDS", "")
+    return (STOPWORDS | {word.strip().casefold() for word in extra.split(",") if word.strip()}) - DIRECTION_WORDS
+
+
+_STOP = _stopwords()
+
+
+@lru_cache(maxsize=65536)
+def merchant_key(description: str) -> str:
+    """
+    Maps a raw transaction description to a canonical merchant key, so the
+    same merchant looks the same whatever card, terminal, date or reference
+    the bank printed with it:
+
+        "POS 1234 TESCO STORES 2931 LONDON 12/03" -> "tesco"
+        "CARD PAYMENT TO NETFLIX.COM 4829"        -> "netflix"
+        "TFR TO 12345678" / "TFR IN 12345678"     -> "tfr to" / "tfr in"
+
+    Direction words (in, to, from, cr, dr, credit, debit) are always kept.
+    Extend the stoplist with MERCHANT_STOPWORDS (comma-separated). Falls back
+    to the case-folded description when nothing is left.
+    """
+    text = description.casefold()
+    # Cheap substring checks first: most descriptions need none of these rules
+    if "*" in text:
+        text = _PROCESSOR.sub(" ", text)
+    if "pa" in text or "pu" in text:
+        text = _PAYMENT.sub(" ", text)
+    if "card" in text:
+        text = _CARD_TYPE.sub(" ", text)
+    if "." in text:
+        text = _DOMAIN.sub(r" \1 ", text)
+    words = [word for word in dict.fromkeys(_TOKENS.findall(text)) if word and word not in _STOP]
+    if not words:
+        return " ".join(text.split())
+    if len(words) > 1 and words[-1] in US_STATES and words[-1] not in DIRECTION_WORDS:
+        # Trailing state code, and the city before it: "... SEATTLE WA"
+        del words[-2 if len(words) > 2 and words[-2] not in DIRECTION_WORDS else -1:]
+    key = words[:MAX_KEY_TOKENS]
+    # Keep the direction even when it comes after the first few words
+    key.extend(word for word in words[MAX_KEY_TOKENS:] if word in DIRECTION_WORDS)
+    return " ".join(key)
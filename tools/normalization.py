@@ -0,0 +1,342 @@
+# tools/normalization.py
+
+import os
+import re
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from tools.transaction_model import Transaction
+
+logger = logging.getLogger(__name__)
+
+# Statement period as (first day, last day)
+Period = Tuple[date, date]
+
+# --- Amounts ---
+_AMOUNT_SEPARATORS = re.compile(r"[^\d.,]")
+_DECIMAL_COMMA = re.compile(r"^\d{1,3}(?:[. ]\d{3})*,\d{1,2}$|^\d+,\d{2}$")
+_DECIMAL_POINT = re.compile(r"^\d{1,3}(?:[, ]\d{3})*\.\d{1,2}$|^\d+\.\d{2}$")
+_THOUSANDS_COMMA = re.compile(r"^\d{1,3}(?:,\d{3})+$")
+_THOUSANDS_POINT = re.compile(r"^\d{1,3}(?:\.\d{3})+$")
+_MINUS_SIGNS = ("-", "−")  # ASCII hyphen-minus and the Unicode minus sign
+_LEADING_MINUS = re.compile(r"^\D*[-−]")  # "-45.00", "£-45.00", "- 45.00"
+# Any explicit direction: a sign, parentheses or a CR/DR suffix
+_SIGN_MARKER = re.compile(r"^\D*[-−+(]|[-−)]\s*$|(?:CR|DR)\.?\s*$", re.IGNORECASE)
+
+
+def detect_decimal_separator(values: Sequence[str]) -> str:
+    """
+    Decides whether a column writes "1,234.56" or "1.234,56" by voting over
+    all its values, so one ambiguous cell ("1,234") can't flip the result.
+    """
+    point_votes = comma_votes = 0
+    for value in values:
+        digits = _AMOUNT_SEPARATORS.sub("", value)
+        if not digits:
+            continue
+        if _DECIMAL_POINT.match(digits) or _THOUSANDS_COMMA.match(digits):
+            point_votes += 1
+        elif _DECIMAL_COMMA.match(digits) or _THOUSANDS_POINT.match(digits):
+            comma_votes += 1
+    return "," if comma_votes > point_votes else "."
+
+
+def _parse_amount(text: str, decimal_separator: str) -> Optional[int]:
+    value = text.strip().upper()
+    if not value:
+        return None
+
+    negative = False
+    if value.endswith("CR"):
+        value = value[:-2]
+    elif value.endswith("DR"):
+        value, negative = value[:-2], True
+    value = value.strip()
+    if value.startswith("(") and value.endswith(")"):
+        value, negative = value[1:-1], True
+    if _LEADING_MINUS.match(value) or value.endswith(_MINUS_SIGNS):
+        negative = True
+
+    digits = _AMOUNT_SEPARATORS.sub("", value)
+    if "." in digits and "," in digits:
+        # Both separators present: the last one is the decimal point, whatever the column says
+        decimal_separator = "." if digits.rfind(".") > digits.rfind(",") else ","
+    thousands_separator = "," if decimal_separator == "." else "."
+    digits = digits.replace(thousands_separator, "")
+    whole, _, fraction = digits.partition(decimal_separator)
+    if not whole and not fraction:
+        return None
+    if not (whole or "0").isdigit() or (fraction and not fraction.isdigit()):
+        return None
+
+    cents = int(whole or "0") * 100 + int((fraction + "00")[:2])
+    if len(fraction) > 2 and fraction[2] >= "5":
+        cents += 1  # Round half up on the third decimal
+    return -cents if negative else cents
+
+
+def has_sign_marker(text: str) -> bool:
+    """True if an amount cell says which way the money went ("-45.00", "(45.00)", "45.00 CR", "+5.00")."""
+    return bool(text) and _SIGN_MARKER.search(text.strip()) is not None
+
+
+def normalize_amount_column(values: Sequence[str]) -> List[Optional[int]]:
+    """
+    Converts a whole column of OCR amount strings into signed integer cents.
+
+    Handles thousands/decimal separators of either locale (decided once per
+    column), currency symbols, leading/trailing minus signs, "(45.00)" and
+    "CR"/"DR" suffixes. Empty or unparseable cells become None. Repeated
+    strings are parsed once.
+    """
+    decimal_separator = detect_decimal_separator(values)
+    parsed: Dict[str, Optional[int]] = {}
+    result: List[Optional[int]] = []
+    for value in values:
+        cents = parsed.get(value, ...)
+        if cents is ...:
+            cents = parsed[value] = _parse_amount(value or "", decimal_separator)
+        result.append(cents)
+    return result
+
+
+# --- Dates ---
+_DAY_FIRST_FORMATS = ("%d/%m/%Y", "%d.%m.%Y", "%d-%m-%Y", "%d/%m/%y", "%d.%m.%y", "%d-%m-%y")
+_MONTH_FIRST_FORMATS = ("%m/%d/%Y", "%m-%d-%Y", "%m/%d/%y", "%m-%d-%y")
+_NAMED_MONTH_FORMATS = ("%Y-%m-%d", "%d %b %Y", "%d %B %Y", "%d-%b-%Y", "%d %b %y", "%d-%b-%y",
+                        "%b %d, %Y", "%B %d, %Y", "%b %d %Y", "%B %d %Y")
+# Formats without a year; the year is inferred from the statement period
+_YEARLESS_DAY_FIRST = ("%d %b", "%d %B", "%d-%b", "%d/%m", "%d.%m")
+_YEARLESS_MONTH_FIRST = ("%b %d", "%B %d", "%m/%d")
+_LEAP_YEAR = 2000  # Lets "29 Feb" parse before the real year is known
+_WHITESPACE = re.compile(r"\s+")
+_SEPT = re.compile(r"\bSept\b", re.IGNORECASE)  # strptime only knows "Sep"
+_HAS_DIGIT = re.compile(r"\d")
+_MAX_DATE_LENGTH = len("September 30, 2024")
+
+_DATE_TOKEN = (r"(\d{4}-\d{2}-\d{2}|\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}|\d{1,2}[ -][A-Za-z]{3,9}[ -]\d{2,4}"
+               r"|[A-Za-z]{3,9} \d{1,2},? \d{4})")
+_PERIOD = re.compile(
+    r"(?:period|from|between)[^\n\d]{0,40}?" + _DATE_TOKEN + r"\s*(?:-|–|to|through|until|and)\s*" + _DATE_TOKEN,
+    re.IGNORECASE,
+)
+
+
+def _date_formats() -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Formats with and without a year, in preference order (STATEMENT_DATE_ORDER=dmy|mdy)."""
+    if os.getenv("STATEMENT_DATE_ORDER", "dmy").lower() == "mdy":
+        return (_MONTH_FIRST_FORMATS + _DAY_FIRST_FORMATS + _NAMED_MONTH_FORMATS,
+                _YEARLESS_MONTH_FIRST + _YEARLESS_DAY_FIRST)
+    return (_DAY_FIRST_FORMATS + _MONTH_FIRST_FORMATS + _NAMED_MONTH_FORMATS,
+            _YEARLESS_DAY_FIRST + _YEARLESS_MONTH_FIRST)
+
+
+def _clean_date(text: str) -> str:
+    return _SEPT.sub("Sep", _WHITESPACE.sub(" ", text.strip().rstrip(".")))
+
+
+def _try_format(text: str, fmt: str, yearless: bool) -> Optional[date]:
+    try:
+        if yearless:
+            return datetime.strptime(f"{text} {_LEAP_YEAR}", f"{fmt} %Y").date()
+        return datetime.strptime(text, fmt).date()
+    except ValueError:
+        return None
+
+
+def parse_date(text: str) -> Optional[date]:
+    """Parses a single date that includes its year, trying every known format."""
+    text = _clean_date(text)
+    full_formats, _ = _date_formats()
+    for fmt in full_formats:
+        parsed = _try_format(text, fmt, yearless=False)
+        if parsed:
+            return parsed
+    return None
+
+
+def find_statement_period(text: str) -> Optional[Period]:
+    """Finds a "Statement period 01/12/2023 to 31/01/2024"-style range in document text."""
+    for match in _PERIOD.finditer(text or ""):
+        start, end = parse_date(match.group(1)), parse_date(match.group(2))
+        if start and end and start <= end:
+            return start, end
+    return None
+
+
+def _infer_year(month_day: date, period: Optional[Period], today: date) -> date:
+    """Places a yearless date in the statement period (handling Dec -> Jan rollover)."""
+    def with_year(year: int) -> Optional[date]:
+        try:
+            return month_day.replace(year=year)
+        except ValueError:  # 29 Feb in a non-leap year
+            return None
+
+    if period:
+        start, end = period
+        candidates = [d for d in (with_year(y) for y in range(start.year, end.year + 1)) if d]
+        slack = timedelta(days=7)
+        for candidate in candidates:
+            if start - slack <= candidate <= end + slack:
+                return candidate
+        if candidates:
+            return min(candidates, key=lambda d: min(abs((d - start).days), abs((d - end).days)))
+
+    # No period: the most recent such date that isn't in the future
+    for year in range(today.year, today.year - 8, -1):
+        candidate = with_year(year)
+        if candidate and candidate <= today + timedelta(days=1):
+            return candidate
+    return month_day
+
+
+def _choose_format(values: Sequence[str], formats: Sequence[str], yearless: bool) -> Tuple[Optional[str], int]:
+    """Returns the format that parses the most values of the column."""
+    best, best_count = None, 0
+    for fmt in formats:
+        count = sum(1 for v in values if _try_format(v, fmt, yearless))
+        if count > best_count:
+            best, best_count = fmt, count
+            if count == len(values):
+                break
+    return best, best_count
+
+
+class DateColumnFormat:
+    """
+    The date format chosen for a statement's date column. Passed to
+    normalize_date_column for each of the statement's tables, so the format
+    vote runs once instead of once per table.
+    """
+
+    __slots__ = ("fmt", "yearless")
+
+    def __init__(self):
+        self.fmt: Optional[str] = None
+        self.yearless = False
+
+
+def _looks_like_date(value: str) -> bool:
+    return len(value) <= _MAX_DATE_LENGTH and bool(_HAS_DIGIT.search(value))
+
+
+def normalize_date_column(values: Sequence[str], period: Optional[Period] = None,
+                          today: Optional[date] = None,
+                          column_format: Optional[DateColumnFormat] = None) -> List[Optional[int]]:
+    """
+    Converts a whole column of OCR date strings into date ordinals.
+
+    The format is chosen once per column - the one that parses the most of a
+    sample of its distinct values - so day/month order is decided by cells
+    like "25/01" instead of guessed per row. Yearless dates ("12 Jan") get
+    their year from the statement period. Unparseable cells become None.
+    With `column_format`, the format chosen for an earlier table is reused
+    as long as it still parses the whole sample.
+    """
+    today = today or date.today()
+    cleaned = [_clean_date(v or "") for v in values]
+    distinct = [v for v in dict.fromkeys(cleaned) if v]
+    sample = [v for v in distinct if _looks_like_date(v)][:50]
+
+    _, yearless_formats = _date_formats()
+    fmt, yearless = (column_format.fmt, column_format.yearless) if column_format else (None, False)
+    days: Dict[str, Optional[date]] = {}
+    if fmt is not None:
+        days = {v: _try_format(v, fmt, yearless) for v in sample}
+        if not all(days.values()):
+            fmt, days = None, {}
+    if fmt is None:
+        fmt, yearless = _choose_date_format(sample)
+        if column_format is not None:
+            column_format.fmt, column_format.yearless = fmt, yearless
+
+    parsed: Dict[str, Optional[int]] = {"": None}
+    for value in distinct:
+        if not _looks_like_date(value):
+            parsed[value] = None  # Not a date; skip the strptime attempts
+            continue
+        day = days[value] if value in days else (_try_format(value, fmt, yearless) if fmt else None)
+        is_yearless = yearless
+        if day is None:  # Odd cell out: try every format before giving up
+            day = parse_date(value)
+            is_yearless = False
+            if day is None:
+                for other in yearless_formats:
+                    day = _try_format(value, other, yearless=True)
+                    if day:
+                        is_yearless = True
+                        break
+        if day is not None and is_yearless:
+            day = _infer_year(day, period, today)
+        parsed[value] = day.toordinal() if day else None
+    return [parsed[v] for v in cleaned]
+
+
+def _choose_date_format(sample: Sequence[str]) -> Tuple[Optional[str], bool]:
+    """Votes a (format, yearless) for a column; yearless formats are only tried when no full format parses it all."""
+    full_formats, yearless_formats = _date_formats()
+    fmt, count = _choose_format(sample, full_formats, yearless=False)
+    if count == len(sample):
+        return fmt, False
+    yearless_fmt, yearless_count = _choose_format(sample, yearless_formats, yearless=True)
+    if yearless_count > count:
+        return yearless_fmt, True
+    return fmt, False
+
+
+# --- Tables ---
+def _signs_from_balance(amounts: List[Optional[int]], raw: Sequence[str],
+                        balances: Sequence[Optional[int]]) -> List[Optional[int]]:
+    """
+    Signs the unsigned cells of a single amount column from the balance
+    change since the previous row ("Debit Credit" columns merged by the
+    text-layer backend print both directions unsigned).
+    """
+    result = list(amounts)
+    for i in range(1, len(result)):
+        amount, previous, balance = result[i], balances[i - 1], balances[i]
+        if amount is None or previous is None or balance is None or has_sign_marker(raw[i]):
+            continue
+        if abs(balance - previous) == abs(amount):
+            result[i] = balance - previous
+    return result
+
+
+def build_transactions(rows: Sequence[Sequence[str]], column_roles: Dict[str, int], page: int,
+                       row_numbers: Sequence[int], period: Optional[Period] = None,
+                       date_format: Optional[DateColumnFormat] = None) -> List[Transaction]:
+    """
+    Normalizes a transaction table column by column and returns its records.
+    Pass the same `date_format` for every table of a statement.
+
+    Split debit/credit columns are combined into one signed amount (money out
+    negative). A single amount column keeps the sign its cells carry
+    (minus, parentheses, CR/DR); unsigned cells take it from the running
+    balance when the balance moved by exactly that amount.
+    """
+    def column(role: str) -> List[str]:
+        index = column_roles.get(role)
+        if index is None:
+            return [""] * len(rows)
+        return [row[index] if index < len(row) else "" for row in rows]
+
+    balances = normalize_amount_column(column("balance"))
+    if "amount" in column_roles:
+        raw_amounts = column("amount")
+        amounts = _signs_from_balance(normalize_amount_column(raw_amounts), raw_amounts, balances)
+    else:
+        # Debit cells are money out unless they say otherwise ("45.00 CR", "-12.00")
+        raw_debits = column("debit")
+        debits = [d if d is None or has_sign_marker(raw) else -abs(d)
+                  for d, raw in zip(normalize_amount_column(raw_debits), raw_debits)]
+        credits = normalize_amount_column(column("credit"))
+        amounts = [None if d is None and c is None else (c or 0) + (d or 0) for d, c in zip(debits, credits)]
+
+    dates = normalize_date_column(column("date"), period, column_format=date_format)
+    descriptions = column("description")
+
+    return [
+        Transaction(date=d, amount_cents=a, description=desc, balance_cents=b, page=page, row=r)
+        for d, a, desc, b, r in zip(dates, amounts, descriptions, balances, row_numbers)
+    ]
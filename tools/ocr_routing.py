@@ -0,0 +1,158 @@
+# tools/ocr_routing.py
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Sequence
+
+from google.api_core import exceptions as api_exceptions
+
+from tools.extractors import Extractor, StatementPage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUOTA_COOLDOWN_SECONDS = 60
+DEFAULT_MAX_IN_FLIGHT = 32
+
+# Provider-side failures that say "back off", as opposed to a bad request
+OUTAGE_ERRORS = (
+    api_exceptions.ResourceExhausted,  # 429: quota exhausted
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+)
+
+
+class ServiceState:
+    """
+    Process-wide health of a remote backend: how many requests are in flight
+    and whether it recently reported quota exhaustion or an outage.
+    """
+
+    def __init__(self, name: str, cooldown_seconds: float, max_in_flight: int):
+        self.name = name
+        self.cooldown_seconds = cooldown_seconds
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._cooldown_until = 0.0
+        self._outages = 0
+
+    @contextmanager
+    def track(self):
+        """Wraps one remote call: counts it in flight and records outage errors."""
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        except OUTAGE_ERRORS as e:
+            self.mark_unavailable(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def mark_unavailable(self, error: Exception) -> None:
+        with self._lock:
+            self._cooldown_until = time.monotonic() + self.cooldown_seconds
+            self._outages += 1
+        logger.warning(f"{self.name} unavailable ({type(error).__name__}: {error}); "
+                       f"routing to local OCR for {self.cooldown_seconds:.0f}s.")
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self._cooldown_until
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "cooling_down": time.monotonic() < self._cooldown_until,
+                "outages": self._outages,
+            }
+
+
+_docai_state: Optional[ServiceState] = None
+_docai_state_lock = threading.Lock()
+
+
+def get_docai_state() -> ServiceState:
+    """
+    Returns the process-wide Document AI state. Tunable with
+    DOCAI_QUOTA_COOLDOWN_S and DOCAI_MAX_IN_FLIGHT (queue depth above which
+    new statements go to local OCR).
+    """
+    global _docai_state
+    with _docai_state_lock:
+        if _docai_state is None:
+            _docai_state = ServiceState(
+                "Document AI",
+                cooldown_seconds=float(os.getenv("DOCAI_QUOTA_COOLDOWN_S", DEFAULT_QUOTA_COOLDOWN_SECONDS)),
+                max_in_flight=int(os.getenv("DOCAI_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)),
+            )
+        return _docai_state
+
+
+class RoutingExtractor(Extractor):
+    """
+    Sends pages to the remote OCR backend unless it is cooling down after a
+    quota/outage error or already has too many requests in flight, in which
+    case the local backend takes them. If the remote backend fails part-way,
+    the pages it hadn't returned yet are read locally instead.
+    """
+
+    name = "ocr"
+
+    def __init__(self, remote: Extractor, local: Extractor, state: ServiceState,
+                 local_available: Callable[[], bool]):
+        self.remote = remote
+        self.local = local
+        self.state = state
+        self.local_available = local_available
+
+    def _use_local(self) -> bool:
+        if not self.local_available():
+            return False
+        if self.state.cooling_down():
+            logger.info(f"{self.state.name} is cooling down; using {self.local.name}.")
+            return True
+        if self.state.in_flight >= self.state.max_in_flight:
+            logger.info(f"{self.state.name} queue depth {self.state.in_flight} >= {self.state.max_in_flight}; using {self.local.name}.")
+            return True
+        return False
+
+    def _fall_back(self, error: Exception, remaining: List[int]) -> None:
+        # Missing config surfaces as RuntimeError: that's the offline case
+        if not self.local_available():
+            raise error
+        logger.warning(f"{self.remote.name} failed ({type(error).__name__}: {error}); "
+                       f"reading {len(remaining)} remaining pages with {self.local.name}.")
+
+    def iter_pages(self, pdf_bytes: bytes, page_indices: Sequence[int], source: str = "document") -> Iterator[StatementPage]:
+        if self._use_local():
+            yield from self.local.iter_pages(pdf_bytes, page_indices, source)
+            return
+
+        done = set()
+        try:
+            for page in self.remote.iter_pages(pdf_bytes, page_indices, source):
+                done.add(page.index)
+                yield page
+        except (RuntimeError, *OUTAGE_ERRORS) as e:
+            remaining = [i for i in page_indices if i not in done]
+            self._fall_back(e, remaining)
+            yield from self.local.iter_pages(pdf_bytes, remaining, source)
+
+    async def extract_pages_async(self, pdf_bytes: bytes, page_indices: Sequence[int],
+                                  source: str = "document") -> List[StatementPage]:
+        if self._use_local():
+            return await self.local.extract_pages_async(pdf_bytes, page_indices, source)
+        try:
+            return await self.remote.extract_pages_async(pdf_bytes, page_indices, source)
+        except (RuntimeError, *OUTAGE_ERRORS) as e:
+            self._fall_back(e, list(page_indices))
+            return await self.local.extract_pages_async(pdf_bytes, page_indices, source)
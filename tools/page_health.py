@@ -0,0 +1,65 @@
+# tools/page_health.py
+
+import logging
+from typing import Dict, List, Set
+
+logger = logging.getLogger(__name__)
+
+
+class PageHealth:
+    """Extraction health of one page: what was found and what had to be skipped."""
+
+    __slots__ = ("index", "backend", "transaction_widths", "rows", "mismatched_rows", "unmatched_widths")
+
+    def __init__(self, index: int, backend: str):
+        self.index = index
+        self.backend = backend
+        self.transaction_widths: List[int] = []  # Column count of each transaction table
+        self.rows = 0
+        self.mismatched_rows = 0  # Rows skipped for having fewer cells than the header
+        self.unmatched_widths: List[int] = []  # Column count of tables that failed the header check
+
+    def problems(self, transaction_widths: Set[int]) -> int:
+        """
+        Skipped rows, plus tables that failed the header check but are as wide
+        as a transaction table of the same statement (most likely a
+        transaction table whose header was misread or cut off).
+        """
+        return self.mismatched_rows + sum(1 for width in self.unmatched_widths if width in transaction_widths)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "page": self.index + 1,
+            "backend": self.backend,
+            "transaction_tables": len(self.transaction_widths),
+            "rows": self.rows,
+            "mismatched_rows": self.mismatched_rows,
+            "unmatched_tables": len(self.unmatched_widths),
+        }
+
+
+class StatementHealth:
+    """Per-page health of one statement, filled in by iter_page_transactions."""
+
+    def __init__(self):
+        self.pages: Dict[int, PageHealth] = {}
+
+    def page(self, index: int, backend: str) -> PageHealth:
+        health = self.pages[index] = PageHealth(index, backend)
+        return health
+
+    @property
+    def transaction_widths(self) -> Set[int]:
+        return {width for page in self.pages.values() for width in page.transaction_widths}
+
+    def unhealthy_pages(self) -> List[int]:
+        """0-based indices of pages with skipped rows or suspicious header failures."""
+        widths = self.transaction_widths
+        return sorted(index for index, page in self.pages.items() if page.problems(widths))
+
+    def log_summary(self, source: str) -> None:
+        unhealthy = self.unhealthy_pages()
+        if unhealthy:
+            details = [self.pages[i].to_dict() for i in unhealthy]
+            logger.warning(f"{len(unhealthy)} of {len(self.pages)} pages of {source} are unhealthy "
+                           f"(re-OCR them with `main.py repair`): {details}")
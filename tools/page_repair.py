@@ -0,0 +1,193 @@
+# tools/page_repair.py
+
+import os
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from google.cloud import documentai_v1 as documentai
+
+from tools.bank_statement_tool import (
+    HeaderCarry,
+    _raw_pb,
+    document_pages,
+    get_processor_name,
+    iter_page_transactions,
+    iter_shard_documents,
+)
+from tools.boilerplate_pages import get_boilerplate_registry
+from tools.extractors import StatementPage, get_extractors, iter_statement_pages
+from tools.page_health import StatementHealth
+from tools.pdf_preflight import preflight
+from tools.pdf_shards import select_pages
+from tools.response_archive import ResponseArchive, get_response_archive
+from tools.scan_preprocess import rasterize_pages
+from tools.transaction_model import Transaction
+
+logger = logging.getLogger(__name__)
+
+_TEXT_ANCHOR = "google.cloud.documentai.v1.Document.TextAnchor"
+
+
+def _text_anchors(message) -> Iterator[Any]:
+    """Every TextAnchor nested anywhere inside a raw protobuf message."""
+    for field, value in message.ListFields():
+        if field.type != field.TYPE_MESSAGE or field.message_type.GetOptions().map_entry:
+            continue
+        for item in (value if field.label == field.LABEL_REPEATED else (value,)):
+            if item.DESCRIPTOR.full_name == _TEXT_ANCHOR:
+                yield item
+            else:
+                yield from _text_anchors(item)
+
+
+def splice_page(target: documentai.Document, position: int, source: documentai.Document,
+                source_position: int) -> documentai.Document:
+    """
+    Returns a copy of `target` with its page at `position` replaced by page
+    `source_position` of `source` (appended if `position` is past the last
+    page). The page's text is appended to the document text and its text
+    anchors are shifted to point at it.
+    """
+    target_pb = type(_raw_pb(target))()
+    target_pb.CopyFrom(_raw_pb(target))
+    source_pb = _raw_pb(source)
+    page = type(source_pb.pages[source_position])()
+    page.CopyFrom(source_pb.pages[source_position])
+
+    anchors = list(_text_anchors(page))
+    segments = [segment for anchor in anchors for segment in anchor.text_segments]
+    start = min((segment.start_index for segment in segments), default=0)
+    end = max((segment.end_index for segment in segments), default=0)
+    offset = len(target_pb.text) - start
+    target_pb.text += source_pb.text[start:end]
+    for segment in segments:
+        segment.start_index += offset
+        segment.end_index += offset
+
+    if position < len(target_pb.pages):
+        page.page_number = target_pb.pages[position].page_number
+        target_pb.pages[position].CopyFrom(page)
+    else:
+        page.page_number = len(target_pb.pages) + 1
+        target_pb.pages.append(page)
+    return documentai.Document.wrap(target_pb)
+
+
+def _splice_into_archive(archive: ResponseArchive, statement: str, source: str, processor_name: str,
+                         repaired: Dict[int, Tuple[documentai.Document, int]]) -> None:
+    """
+    Replaces repaired pages inside the most recent archived response that
+    holds them, saved as a new response so re-parsing picks it up. Pages that
+    were never archived (read from the text layer) get a response of their own.
+    Entries are marked with their repaired pages, which Document AI extraction
+    then uses in place of its own (cached) result for those pages.
+    """
+    entries = archive.statements().get(statement, [])
+    by_entry: Dict[int, List[int]] = {}
+    unarchived: List[int] = []
+    for index in sorted(repaired):
+        holder = next((n for n in range(len(entries) - 1, -1, -1) if index in entries[n].pages), None)
+        if holder is None:
+            unarchived.append(index)
+        else:
+            by_entry.setdefault(holder, []).append(index)
+
+    for holder, indices in by_entry.items():
+        entry = entries[holder]
+        document = archive.load(entry)
+        for index in indices:
+            document = splice_page(document, entry.pages.index(index), *repaired[index])
+        processor = entry.processor if entry.processor == processor_name else f"{entry.processor}+{processor_name}"
+        archive.save(statement, source, entry.pages, processor, document, sorted(set(entry.repaired) | set(indices)))
+    if unarchived:
+        document = documentai.Document()
+        for position, index in enumerate(unarchived):
+            document = splice_page(document, position, *repaired[index])
+        archive.save(statement, source, unarchived, processor_name, document, unarchived)
+
+
+def repair_statement(file_path: str, processor_id: Optional[str] = None,
+                     rasterize_dpi: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Re-OCRs only the unhealthy pages of a statement (rows skipped for cell
+    count mismatches, or tables that failed the header check) instead of the
+    whole file, and keeps a re-OCR'd page only if it comes out healthier.
+
+    Args:
+        file_path: The PDF statement.
+        processor_id: Document AI processor for the retry; defaults to
+            DOCUMENT_AI_REPAIR_PROCESSOR_ID, then the normal processor.
+        rasterize_dpi: If set, the pages are re-rendered as grayscale images
+            at this DPI before upload (ignores a broken text layer).
+
+    Returns:
+        A dict with the final `transactions` and, by 1-based page number,
+        the pages found `unhealthy`, `repaired` and `still_unhealthy`.
+        Accepted pages are spliced into the archived Document AI responses,
+        and later extractions of the same file use them (this needs the
+        response archive enabled).
+
+    Raises:
+        PreflightError: If the file is rejected before any extraction.
+        RuntimeError: If OCR is needed but the GCP config is missing.
+    """
+    pdf_bytes = Path(file_path).read_bytes()
+    report = preflight(pdf_bytes, source=file_path)
+    boilerplate = get_boilerplate_registry()
+    skip_pages = boilerplate.known_boilerplate(report.page_hashes) if boilerplate else []
+    pages: List[StatementPage] = list(iter_statement_pages(
+        pdf_bytes, report.page_count, get_extractors(), HeaderCarry().page_has_transaction_table, report, skip_pages,
+        source=file_path))
+
+    health = StatementHealth()
+    transactions: List[Transaction] = list(iter_page_transactions(pages, source=file_path, health=health))
+    unhealthy = health.unhealthy_pages()
+    result: Dict[str, Any] = {"source": file_path, "transactions": transactions,
+                              "unhealthy": [i + 1 for i in unhealthy], "repaired": [], "still_unhealthy": []}
+    if not unhealthy:
+        logger.info(f"Repair: all {len(pages)} pages of {file_path} are healthy.")
+        return result
+
+    processor_name = get_processor_name(processor_id or os.getenv("DOCUMENT_AI_REPAIR_PROCESSOR_ID"))
+    if not processor_name:
+        raise RuntimeError("Missing GCP config environment variables.")
+    upload = select_pages(pdf_bytes, unhealthy)
+    if rasterize_dpi:
+        upload = rasterize_pages(upload, rasterize_dpi)
+    logger.info(f"Repair: re-submitting pages {result['unhealthy']} of {file_path} to {processor_name}.")
+
+    candidates: Dict[int, Tuple[StatementPage, documentai.Document, int]] = {}
+    for start, document in iter_shard_documents(upload, len(unhealthy), processor_name):
+        for position, page in enumerate(document_pages(document, unhealthy, start)):
+            candidates[page.index] = (page, document, position)
+
+    retry_health = StatementHealth()
+    # Judged in context, so re-OCR'd continuation tables can pick up the header carried from earlier pages
+    retried = [candidates[page.index][0] if page.index in candidates else page for page in pages]
+    list(iter_page_transactions(retried, source=file_path, health=retry_health))  # Only the health record is needed
+    widths = health.transaction_widths | retry_health.transaction_widths
+    accepted: Dict[int, StatementPage] = {}
+    for index, (page, _, _) in candidates.items():
+        before, after = health.pages[index], retry_health.pages[index]
+        if after.problems(widths) < before.problems(widths) and after.rows >= before.rows:
+            accepted[index] = page
+        else:
+            logger.info(f"Repair: page {index + 1} is no better after re-OCR; keeping the original.")
+
+    if accepted:
+        archive = get_response_archive()
+        if archive:
+            statement = ResponseArchive.statement_id(pdf_bytes)
+            _splice_into_archive(archive, statement, file_path, processor_name,
+                                 {index: candidates[index][1:] for index in accepted})
+        final_health = StatementHealth()
+        pages = [accepted.get(page.index, page) for page in pages]
+        result["transactions"] = list(iter_page_transactions(pages, source=file_path, health=final_health))
+        health = final_health
+
+    result["repaired"] = [i + 1 for i in sorted(accepted)]
+    result["still_unhealthy"] = [i + 1 for i in health.unhealthy_pages()]
+    logger.info(f"Repair: {file_path}: repaired pages {result['repaired']}, "
+                f"still unhealthy {result['still_unhealthy']}, {len(result['transactions'])} transactions.")
+    return result
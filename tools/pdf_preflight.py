@@ -0,0 +1,183 @@
+# tools/pdf_preflight.py
+
+import io
+import os
+import time
+import hashlib
+import logging
+from typing import List, Optional
+
+from pypdf import PdfReader
+from pypdf.errors import PdfReadError
+from pypdf.generic import ArrayObject
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MB = 40
+DEFAULT_MAX_PAGES = 500
+# The spec allows junk before the header, but only within the first 1024 bytes
+_HEADER_WINDOW = 1024
+
+
+class PreflightError(ValueError):
+    """The file can't be processed as a statement; raised before any OCR call."""
+
+
+class PreflightReport:
+    """
+    What can be learned about a PDF from its structure alone, without
+    rendering or OCR: size, page count, encryption and, per page, whether it
+    has a text layer (uses fonts) or is image-only (scanned), and a hash of
+    its content so repeated pages can be recognized across statements.
+    """
+
+    __slots__ = ("byte_size", "is_pdf", "encrypted", "needs_password", "page_count", "text_pages",
+                 "page_hashes", "seconds")
+
+    def __init__(self, byte_size: int, is_pdf: bool, encrypted: bool = False, needs_password: bool = False,
+                 page_count: int = 0, text_pages: Optional[List[bool]] = None,
+                 page_hashes: Optional[List[str]] = None, seconds: float = 0.0):
+        self.byte_size = byte_size
+        self.is_pdf = is_pdf
+        self.encrypted = encrypted
+        self.needs_password = needs_password
+        self.page_count = page_count
+        self.text_pages = text_pages or []
+        self.page_hashes = page_hashes or []
+        self.seconds = seconds
+
+    @property
+    def has_text_layer(self) -> bool:
+        return any(self.text_pages)
+
+    @property
+    def scanned_pages(self) -> List[int]:
+        return [index for index, has_text in enumerate(self.text_pages) if not has_text]
+
+    def __repr__(self) -> str:
+        return (f"PreflightReport(bytes={self.byte_size}, pages={self.page_count}, "
+                f"text_pages={sum(self.text_pages)}, encrypted={self.encrypted}, {self.seconds * 1000:.1f} ms)")
+
+
+def _has_fonts(resources, depth: int = 0) -> bool:
+    """True if a resource dictionary (or a form XObject it uses) declares fonts."""
+    if resources is None:
+        return False
+    resources = resources.get_object()
+    if resources.get("/Font"):
+        return True
+    if depth < 2:  # Text can sit inside form XObjects (templates, stamps)
+        xobjects = resources.get("/XObject")
+        for xobject in (xobjects.get_object().values() if xobjects else ()):
+            xobject = xobject.get_object()
+            if xobject.get("/Subtype") == "/Form" and _has_fonts(xobject.get("/Resources"), depth + 1):
+                return True
+    return False
+
+
+def page_has_text_layer(page) -> bool:
+    """True if the page uses fonts, i.e. has text to read without OCR."""
+    return _has_fonts(page.get("/Resources"))
+
+
+def _stream_bytes(stream) -> bytes:
+    # The encoded bytes as stored in the file: hashing them needs no decompression
+    return getattr(stream.get_object(), "_data", b"") or b""
+
+
+def page_hash(page) -> str:
+    """
+    Hashes what a page draws: its content streams plus the XObjects (images,
+    forms) they reference. Identical terms-and-conditions pages hash the same
+    in every month's statement; scanned pages differ by their image data.
+    """
+    digest = hashlib.sha1()
+    contents = page.get("/Contents")
+    if contents is not None:
+        contents = contents.get_object()
+        for stream in (contents if isinstance(contents, ArrayObject) else [contents]):
+            digest.update(_stream_bytes(stream))
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources is not None else None
+    for name, xobject in sorted((xobjects.get_object() if xobjects else {}).items()):
+        digest.update(name.encode("utf-8"))
+        digest.update(_stream_bytes(xobject))
+    return digest.hexdigest()
+
+
+def inspect_pdf(pdf_bytes: bytes) -> PreflightReport:
+    """
+    Reads the PDF structure (header, trailer, page tree, page resources)
+    without decoding or rendering any content stream. Takes milliseconds.
+    """
+    started = time.perf_counter()
+    if b"%PDF-" not in pdf_bytes[:_HEADER_WINDOW]:
+        return PreflightReport(len(pdf_bytes), is_pdf=False, seconds=time.perf_counter() - started)
+
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        encrypted = reader.is_encrypted
+        if encrypted and not reader.decrypt(""):  # Owner-password-only PDFs open with an empty password
+            return PreflightReport(len(pdf_bytes), True, encrypted=True, needs_password=True,
+                                   seconds=time.perf_counter() - started)
+        text_pages, page_hashes = [], []
+        for page in reader.pages:
+            text_pages.append(page_has_text_layer(page))
+            page_hashes.append(page_hash(page))
+    except (PdfReadError, ValueError, KeyError) as e:
+        logger.warning(f"Pre-flight could not read PDF structure: {e}")
+        return PreflightReport(len(pdf_bytes), is_pdf=False, seconds=time.perf_counter() - started)
+
+    return PreflightReport(len(pdf_bytes), True, encrypted=encrypted, page_count=len(text_pages),
+                           text_pages=text_pages, page_hashes=page_hashes, seconds=time.perf_counter() - started)
+
+
+def _max_bytes() -> float:
+    return float(os.getenv("STATEMENT_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024
+
+
+def _check_size(byte_size: int, source: str) -> None:
+    max_bytes = _max_bytes()
+    if byte_size > max_bytes:
+        raise PreflightError(f"{source} is {byte_size / 1024 / 1024:.1f} MB (limit {max_bytes / 1024 / 1024:.0f} MB).")
+
+
+def check_preflight(report: PreflightReport, source: str = "document") -> None:
+    """
+    Rejects files that would fail (or waste) an OCR call. Limits come from
+    STATEMENT_MAX_MB and STATEMENT_MAX_PAGES.
+
+    Raises:
+        PreflightError: Not a PDF, password protected, empty, or too large.
+    """
+    max_pages = int(os.getenv("STATEMENT_MAX_PAGES", DEFAULT_MAX_PAGES))
+
+    if not report.is_pdf:
+        raise PreflightError(f"{source} is not a readable PDF.")
+    if report.needs_password:
+        raise PreflightError(f"{source} is password protected.")
+    if report.page_count == 0:
+        raise PreflightError(f"{source} has no pages.")
+    _check_size(report.byte_size, source)
+    if report.page_count > max_pages:
+        raise PreflightError(f"{source} has {report.page_count} pages (limit {max_pages}).")
+
+
+def preflight(pdf_bytes: bytes, source: str = "document") -> PreflightReport:
+    """Inspects a PDF and rejects it early if it can't be processed."""
+    _check_size(len(pdf_bytes), source)  # Before parsing: an oversized upload shouldn't pay for the page walk
+    report = inspect_pdf(pdf_bytes)
+    logger.info(f"Pre-flight {source}: {report}")
+    check_preflight(report, source)
+    return report
+
+
+def fit_shard_pages(byte_size: int, page_count: int, shard_pages: int, max_request_bytes: int) -> int:
+    """
+    Shrinks the pages per shard so that a shard of average pages stays under
+    the request size limit (scans at high resolution can be MBs per page).
+    """
+    if page_count <= 0 or byte_size <= max_request_bytes:
+        return shard_pages
+    bytes_per_page = byte_size / page_count
+    return max(1, min(shard_pages, int(max_request_bytes // bytes_per_page)))
@@ -0,0 +1,61 @@
+# tools/pdf_shards.py
+
+import io
+import logging
+from typing import List, Sequence, Tuple
+
+from pypdf import PdfReader, PdfWriter
+
+logger = logging.getLogger(__name__)
+
+
+def open_pdf(pdf_bytes: bytes) -> PdfReader:
+    """Opens a PDF for reading, unlocking owner-password-only (empty user password) files."""
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    if reader.is_encrypted:
+        reader.decrypt("")
+    return reader
+
+
+def count_pages(pdf_bytes: bytes) -> int:
+    """Returns the page count of a PDF without rendering anything."""
+    return len(open_pdf(pdf_bytes).pages)
+
+
+def subset_pdf(reader: PdfReader, page_indices: Sequence[int]) -> bytes:
+    """Builds a new PDF containing only the given (0-based) pages, in order."""
+    writer = PdfWriter()
+    for index in page_indices:
+        writer.add_page(reader.pages[index])
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def select_pages(pdf_bytes: bytes, page_indices: Sequence[int]) -> bytes:
+    """Returns a PDF with only the given pages; the original bytes if that's all of them."""
+    reader = open_pdf(pdf_bytes)
+    if list(page_indices) == list(range(len(reader.pages))):
+        return pdf_bytes
+    return subset_pdf(reader, page_indices)
+
+
+def split_pdf(pdf_bytes: bytes, pages_per_shard: int) -> List[Tuple[int, bytes]]:
+    """
+    Splits a PDF into consecutive page-range shards.
+
+    Returns:
+        List of (first_page_index, shard_bytes) in page order. A PDF that fits
+        in one shard is returned unchanged as a single shard starting at 0.
+    """
+    reader = open_pdf(pdf_bytes)
+    page_count = len(reader.pages)
+    if pages_per_shard <= 0 or page_count <= pages_per_shard:
+        return [(0, pdf_bytes)]
+
+    shards = []
+    for start in range(0, page_count, pages_per_shard):
+        end = min(start + pages_per_shard, page_count)
+        shards.append((start, subset_pdf(reader, range(start, end))))
+    logger.info(f"Split {page_count}-page PDF into {len(shards)} shards of up to {pages_per_shard} pages.")
+    return shards
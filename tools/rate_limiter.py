@@ -0,0 +1,199 @@
+# tools/rate_limiter.py
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+from google.api_core import exceptions as api_exceptions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QPM = 60
+DEFAULT_TPM = 0  # 0: no token limit
+# Bucket capacity, in seconds of the current rate (how much burst is allowed)
+DEFAULT_BURST_SECONDS = 5
+# AIMD: each success adds back this fraction of the configured rate; each 429
+# multiplies the current rate by DECREASE, never below MIN_SCALE of it
+INCREASE = 0.05
+DECREASE = 0.5
+MIN_SCALE = 0.05
+# When a 429 carries no retry-after, pause everyone for this long
+DEFAULT_THROTTLE_PAUSE_SECONDS = 5
+
+THROTTLE_ERRORS = (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """The server's requested back-off, from an HTTP Retry-After header or a gRPC RetryInfo detail."""
+    response = getattr(error, "response", None)
+    header = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            pass
+    for detail in getattr(error, "details", None) or ():
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    return None
+
+
+class RateLimiter:
+    """
+    Token bucket for one remote API, shared by every caller in the process
+    (threads and event loops alike).
+
+    Requests are limited per minute (`qpm`) and, optionally, by estimated
+    model tokens per minute (`tpm`). The effective rate adapts AIMD-style:
+    each rate-limit error (429 / ResourceExhausted) halves it and pauses all
+    callers for the server's retry-after, and each success adds back a
+    little, up to the configured rate.
+    """
+
+    def __init__(self, name: str, qpm: float, tpm: float = 0, burst_seconds: float = DEFAULT_BURST_SECONDS):
+        self.name = name
+        self.qpm = qpm
+        self.tpm = tpm
+        self.burst_seconds = burst_seconds
+        self.scale = 1.0  # Fraction of the configured rate currently allowed
+        self._lock = threading.Lock()
+        self._requests = self._capacity(qpm)
+        self._tokens = self._capacity(tpm)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self.acquired = 0
+        self.throttled = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _capacity(self, per_minute: float) -> float:
+        return max(1.0, per_minute * self.scale * self.burst_seconds / 60)
+
+    def _refill(self, now: float) -> None:
+        # Called with the lock held.
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self._capacity(self.qpm), self._requests + elapsed * self.qpm * self.scale / 60)
+        if self.tpm:
+            self._tokens = min(self._capacity(self.tpm), self._tokens + elapsed * self.tpm * self.scale / 60)
+
+    def _reserve(self, cost: float) -> float:
+        """Takes one request (and `cost` tokens) if available; otherwise returns how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._paused_until:
+                return self._paused_until - now
+            cost = cost if self.tpm else 0
+            # A call estimated above the bucket's capacity goes once the bucket is
+            # full and leaves it in debt; otherwise it could never be admitted
+            needed = min(cost, self._capacity(self.tpm))
+            wait = 0.0
+            if self._requests < 1:
+                wait = (1 - self._requests) * 60 / (self.qpm * self.scale)
+            if self.tpm and self._tokens < needed:
+                wait = max(wait, (needed - self._tokens) * 60 / (self.tpm * self.scale))
+            if wait > 0:
+                return wait
+            self._requests -= 1
+            self._tokens -= cost
+            self.acquired += 1
+            return 0.0
+
+    def _waited(self, seconds: float) -> None:
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds += seconds
+
+    def acquire(self, cost: float = 0) -> None:
+        """Blocks until a request estimated at `cost` model tokens may be sent."""
+        while (wait := self._reserve(cost)) > 0:
+            self._waited(wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, cost: float = 0) -> None:
+        """Async variant of acquire; waits without blocking the event loop."""
+        while (wait := self._reserve(cost)) > 0:
+            self._waited(wait)
+            await asyncio.sleep(wait)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.scale = min(1.0, self.scale + INCREASE)
+
+    def on_throttled(self, error: Exception) -> None:
+        pause = retry_after_seconds(error)
+        pause = DEFAULT_THROTTLE_PAUSE_SECONDS if pause is None else pause
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.scale = max(MIN_SCALE, self.scale * DECREASE)
+            self._paused_until = max(self._paused_until, now + pause)
+            self._requests = min(self._requests, 0.0)
+            self.throttled += 1
+        logger.warning(f"{self.name} rate limited ({type(error).__name__}: {error}); pausing {pause:.1f}s, "
+                       f"rate now {self.qpm * self.scale:.1f} requests/min.")
+
+    @contextmanager
+    def limit(self, cost: float = 0):
+        """Wraps one call: waits for capacity first, then adapts the rate to how it went."""
+        self.acquire(cost)
+        try:
+            yield
+        except THROTTLE_ERRORS as e:
+            self.on_throttled(e)
+            raise
+        self.on_success()
+
+    @asynccontextmanager
+    async def limit_async(self, cost: float = 0):
+        """Async variant of limit."""
+        await self.acquire_async(cost)
+        try:
+            yield
+        except THROTTLE_ERRORS as e:
+            self.on_throttled(e)
+            raise
+        self.on_success()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "qpm": round(self.qpm * self.scale, 2),
+                "tpm": round(self.tpm * self.scale, 2),
+                "scale": round(self.scale, 3),
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str = "vertex") -> RateLimiter:
+    """
+    Returns the process-wide limiter for an API, configured from
+    <NAME>_QPM and <NAME>_TPM (e.g. VERTEX_QPM=60, VERTEX_TPM=0 for no
+    token limit).
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            prefix = name.upper()
+            limiter = _limiters[name] = RateLimiter(
+                name,
+                qpm=float(os.getenv(f"{prefix}_QPM", DEFAULT_QPM)),
+                tpm=float(os.getenv(f"{prefix}_TPM", DEFAULT_TPM)),
+            )
+            logger.info(f"Rate limiter '{name}': {limiter.qpm:g} requests/min, "
+                        f"{f'{limiter.tpm:g} tokens/min' if limiter.tpm else 'no token limit'}.")
+        return limiter
@@ -0,0 +1,99 @@
+# tools/reparse.py
+
+import os
+import json
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from tools.bank_statement_tool import document_pages, iter_page_transactions
+from tools.extractors import StatementPage
+from tools.layout_registry import get_layout_registry
+from tools.response_archive import DEFAULT_ARCHIVE_DIR, ArchiveEntry, ResponseArchive
+
+logger = logging.getLogger(__name__)
+
+
+def archived_pages(archive: ResponseArchive, entries: List[ArchiveEntry]) -> List[StatementPage]:
+    """
+    Rebuilds a statement's pages from its stored responses, in page order.
+    When a page was stored more than once, the most recent response wins.
+    """
+    pages: Dict[int, StatementPage] = {}
+    for entry in entries:
+        for page in document_pages(archive.load(entry), entry.pages):
+            pages[page.index] = page
+    return [pages[index] for index in sorted(pages)]
+
+
+def _init_worker() -> None:
+    # Workers learn new layouts in memory only: they would race each other on
+    # the registry file, and the next regular run learns them again anyway.
+    get_layout_registry().persist = False
+
+
+def _reparse_statement(archive_dir: str, statement: str, entries: List[ArchiveEntry], output_dir: str) -> Dict[str, Any]:
+    # Runs in a worker process: table detection and row mapping only, no OCR.
+    started = time.perf_counter()
+    source = entries[-1].source
+    record: Dict[str, Any] = {"statement": statement, "source": source, "output": None, "error": None}
+    try:
+        pages = archived_pages(ResponseArchive(archive_dir), entries)
+        transactions = list(iter_page_transactions(pages, source=source))
+        target = Path(output_dir) / f"{Path(source).stem}__{statement[:12]}.json"
+        target.write_text(json.dumps([t.to_dict() for t in transactions], ensure_ascii=False, indent=2), encoding="utf-8")
+        record.update(output=str(target), pages=len(pages), transactions=len(transactions))
+    except Exception as e:
+        logger.error(f"Reparse: failed for {source} ({statement[:12]}): {e}", exc_info=True)
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def reparse(archive_dir: str = DEFAULT_ARCHIVE_DIR, output_dir: str = "reparse_output",
+            workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Re-runs table detection and row mapping over every statement in the
+    response archive, in parallel across CPU cores, without calling OCR.
+
+    Only pages that went through Document AI are archived; pages read from a
+    PDF's text layer are not part of the result.
+
+    Writes one `<name>__<statement>.json` per statement and a `summary.json`
+    into `output_dir`, and returns the summary dict.
+    """
+    archive = ResponseArchive(archive_dir)
+    statements = archive.statements()
+    out_path = Path(output_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Reparse: {len(statements)} statements from '{archive_dir}' -> '{out_path}' ({workers} workers).")
+
+    started = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(_reparse_statement, archive_dir, statement, entries, str(out_path))
+                   for statement, entries in statements.items()]
+        for future in as_completed(futures):
+            results.append(future.result())
+    wall_seconds = time.perf_counter() - started
+
+    results.sort(key=lambda r: r["source"])
+    failures = [r for r in results if r["error"]]
+    summary = {
+        "archive": archive_dir,
+        "statements": len(results),
+        "succeeded": len(results) - len(failures),
+        "failed": len(failures),
+        "transactions": sum(r.get("transactions", 0) for r in results),
+        "workers": workers,
+        "wall_seconds": round(wall_seconds, 3),
+        "statements_per_second": round(len(results) / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "failures": [{"source": r["source"], "statement": r["statement"], "error": r["error"]} for r in failures],
+        "results": results,
+    }
+    (out_path / "summary.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    logger.info(f"Reparse finished: {summary['succeeded']}/{summary['statements']} statements in {summary['wall_seconds']}s.")
+    return summary
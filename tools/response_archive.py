@@ -0,0 +1,163 @@
+# tools/response_archive.py
+
+import os
+import json
+import zlib
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from google.cloud import documentai_v1 as documentai
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = ".cache/docai_archive"
+MANIFEST_NAME = "manifest.jsonl"
+_COMPRESSION_LEVEL = 6
+
+
+class ArchiveEntry:
+    """One stored Document AI response: which statement pages it covers and where its blob is."""
+
+    __slots__ = ("statement", "source", "pages", "processor", "blob", "size", "stored_size", "saved_at", "repaired")
+
+    def __init__(self, statement: str, source: str, pages: List[int], processor: str, blob: str,
+                 size: int, stored_size: int, saved_at: str, repaired: Optional[List[int]] = None):
+        self.statement = statement  # sha256 of the statement PDF
+        self.source = source
+        self.pages = pages  # Original page index of each page in the response
+        self.processor = processor
+        self.blob = blob
+        self.size = size
+        self.stored_size = stored_size
+        self.saved_at = saved_at
+        self.repaired = repaired or []  # Pages of this response re-OCR'd by page repair
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ResponseArchive:
+    """
+    Keeps every Document AI response for good, so statements can be re-parsed
+    with improved table heuristics without paying for OCR again.
+
+    Each response is stored once as a zlib-compressed serialized proto
+    (content-addressed, `blobs/ab/<sha256>.pb.z`); `manifest.jsonl` gets one
+    line per response saying which statement and pages it covers. Unlike the
+    response cache, nothing is ever evicted.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.manifest_path = self.root / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._known: Optional[set] = None  # (statement, blob) pairs already in the manifest
+        # Statement -> entries with repaired pages, as of the manifest size they were read at
+        self._repairs: Dict[str, List[ArchiveEntry]] = {}
+        self._repairs_read_at = -1
+
+    @staticmethod
+    def statement_id(pdf_bytes: bytes) -> str:
+        return hashlib.sha256(pdf_bytes).hexdigest()
+
+    def _load_known(self) -> set:
+        # Called with the lock held.
+        if self._known is None:
+            self._known = {(e.statement, e.blob) for e in self.entries()}
+        return self._known
+
+    def save(self, statement: str, source: str, pages: Sequence[int], processor: str,
+             document: documentai.Document, repaired: Sequence[int] = ()) -> None:
+        """
+        Stores one response (a whole statement or one shard/page subset of it);
+        `repaired` lists the pages in it that page repair replaced.
+        """
+        data = documentai.Document.serialize(document)
+        digest = hashlib.sha256(data).hexdigest()
+        blob = f"blobs/{digest[:2]}/{digest}.pb.z"
+        try:
+            with self._lock:
+                if (statement, blob) in self._load_known():
+                    return
+                blob_path = self.root / blob
+                if not blob_path.exists():
+                    compressed = zlib.compress(data, _COMPRESSION_LEVEL)
+                    blob_path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path = blob_path.with_suffix(f".tmp{threading.get_ident()}")
+                    tmp_path.write_bytes(compressed)
+                    os.replace(tmp_path, blob_path)
+                stored_size = blob_path.stat().st_size
+                entry = ArchiveEntry(statement, source, list(pages), processor, blob, len(data), stored_size,
+                                     datetime.now(timezone.utc).isoformat(timespec="seconds"), list(repaired))
+                with self.manifest_path.open("a", encoding="utf-8") as manifest:
+                    manifest.write(json.dumps(entry.to_dict(), ensure_ascii=False) + "\n")
+                self._known.add((statement, blob))
+            logger.debug(f"Archived Document AI response for {source} pages {[p + 1 for p in pages]} "
+                         f"({len(data) / 1024:.0f} KiB -> {stored_size / 1024:.0f} KiB)")
+        except OSError as e:
+            logger.warning(f"Could not archive Document AI response for {source}: {e}")
+
+    def entries(self) -> List[ArchiveEntry]:
+        """Reads the manifest, oldest entry first."""
+        if not self.manifest_path.is_file():
+            return []
+        entries = []
+        with self.manifest_path.open(encoding="utf-8") as manifest:
+            for line_number, line in enumerate(manifest, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(ArchiveEntry(**json.loads(line)))
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"Skipping bad manifest line {line_number} in {self.manifest_path}: {e}")
+        return entries
+
+    def statements(self) -> Dict[str, List[ArchiveEntry]]:
+        """Groups manifest entries by statement, in the order they were saved."""
+        grouped: Dict[str, List[ArchiveEntry]] = {}
+        for entry in self.entries():
+            grouped.setdefault(entry.statement, []).append(entry)
+        return grouped
+
+    def repairs(self, statement: str) -> List[ArchiveEntry]:
+        """
+        Entries holding repaired pages of a statement, oldest first (so later
+        repairs win). Re-read whenever the manifest grows, so repairs made by
+        another process (`main.py repair`) are picked up.
+        """
+        try:
+            manifest_size = self.manifest_path.stat().st_size
+        except OSError:
+            return []
+        with self._lock:
+            if manifest_size != self._repairs_read_at:
+                self._repairs, self._repairs_read_at = {}, manifest_size
+                for entry in self.entries():
+                    if entry.repaired:
+                        self._repairs.setdefault(entry.statement, []).append(entry)
+            return list(self._repairs.get(statement, []))
+
+    def load(self, entry: ArchiveEntry) -> documentai.Document:
+        return documentai.Document.deserialize(zlib.decompress((self.root / entry.blob).read_bytes()))
+
+
+_archive: Optional[ResponseArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_response_archive() -> Optional[ResponseArchive]:
+    """
+    Returns the process-wide response archive (DOCAI_ARCHIVE_DIR), or None
+    if disabled via DOCAI_ARCHIVE_ENABLED=false.
+    """
+    global _archive
+    if os.getenv("DOCAI_ARCHIVE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _archive_lock:
+        if _archive is None:
+            _archive = ResponseArchive(os.getenv("DOCAI_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR))
+        return _archive
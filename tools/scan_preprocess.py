@@ -0,0 +1,132 @@
+# tools/scan_preprocess.py
+
+import io
+import os
+import logging
+import threading
+from typing import Iterator, Optional, Sequence, Tuple
+
+from pypdf import PdfReader, PdfWriter
+
+from tools.pdf_preflight import page_has_text_layer
+from tools.pdf_shards import open_pdf
+
+logger = logging.getLogger(__name__)
+
+# Document AI reads 200 DPI grayscale scans about as well as 300-600 DPI colour
+DEFAULT_UPLOAD_DPI = 200
+DEFAULT_JPEG_QUALITY = 75
+# Scans already at most this much above the target DPI (and grayscale) are left alone
+_DPI_TOLERANCE = 1.15
+
+# pdfium is not thread-safe; statements are processed from several threads
+_pdfium_lock = threading.Lock()
+
+
+def render_pages(pdf_bytes: bytes, page_indices: Sequence[int], dpi: int) -> Iterator[Tuple[int, object]]:
+    """Renders pages to grayscale PIL images at the given DPI, one at a time, in order."""
+    import pypdfium2 as pdfium
+
+    for index in page_indices:
+        with _pdfium_lock:
+            pdf = pdfium.PdfDocument(pdf_bytes)
+            try:
+                page = pdf[index]
+                try:
+                    image = page.render(scale=dpi / 72, grayscale=True).to_pil().convert("L")
+                finally:
+                    page.close()
+            finally:
+                pdf.close()
+        yield index, image
+
+
+def _scan_dpi_and_color(page) -> Tuple[float, bool]:
+    """Resolution and colour of the largest image on a page (0 DPI if it has none)."""
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources is not None else None
+    page_width_inches = float(page.mediabox.width) / 72 or 1
+    best_width, color = 0, False
+    for xobject in (xobjects.get_object().values() if xobjects else ()):
+        xobject = xobject.get_object()
+        if xobject.get("/Subtype") != "/Image":
+            continue
+        width = int(xobject.get("/Width", 0))
+        if width > best_width:
+            best_width = width
+            color = xobject.get("/ColorSpace") not in ("/DeviceGray", "/CalGray", None)
+    return best_width / page_width_inches, color
+
+
+def _replace_with_images(pdf_bytes: bytes, reader: PdfReader, targets: Sequence[int], dpi: int, quality: int) -> bytes:
+    """Rewrites the PDF with the `targets` pages replaced by grayscale JPEG renders of themselves."""
+    writer = PdfWriter()
+    rendered = render_pages(pdf_bytes, targets, dpi)
+    target_set = set(targets)
+    for index, page in enumerate(reader.pages):
+        if index not in target_set:
+            writer.add_page(page)
+            continue
+        _, image = next(rendered)
+        buffer = io.BytesIO()
+        image.save(buffer, "PDF", resolution=dpi, quality=quality)
+        writer.add_page(PdfReader(buffer).pages[0])
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def downsample_scanned_pages(pdf_bytes: bytes, dpi: int, quality: int = DEFAULT_JPEG_QUALITY) -> bytes:
+    """
+    Re-encodes image-only (scanned) pages as grayscale JPEG at `dpi`, keeping
+    pages with a text layer as they are and each page's physical size. Returns
+    the original bytes if nothing needed re-encoding or the result isn't smaller.
+    """
+    reader = open_pdf(pdf_bytes)
+    targets = []
+    for index, page in enumerate(reader.pages):
+        if page_has_text_layer(page):
+            continue
+        scan_dpi, color = _scan_dpi_and_color(page)
+        if scan_dpi > dpi * _DPI_TOLERANCE or (scan_dpi and color):
+            targets.append(index)
+    if not targets:
+        return pdf_bytes
+
+    result = _replace_with_images(pdf_bytes, reader, targets, dpi, quality)
+    if len(result) >= len(pdf_bytes):
+        logger.info(f"Re-encoding {len(targets)} scanned pages would not shrink the upload; sending the original.")
+        return pdf_bytes
+    logger.info(f"Re-encoded {len(targets)} scanned pages to {dpi} DPI grayscale: "
+                f"{len(pdf_bytes) / 1024:.0f} KiB -> {len(result) / 1024:.0f} KiB "
+                f"(-{100 * (1 - len(result) / len(pdf_bytes)):.0f}%)")
+    return result
+
+
+def rasterize_pages(pdf_bytes: bytes, dpi: int = 300, quality: int = 90) -> bytes:
+    """
+    Re-renders every page as a grayscale image, text layer included, so OCR
+    reads what is printed rather than a broken or oddly ordered text layer.
+    Used when re-submitting pages whose tables came out wrong.
+    """
+    reader = open_pdf(pdf_bytes)
+    return _replace_with_images(pdf_bytes, reader, range(len(reader.pages)), dpi, quality)
+
+
+def get_upload_dpi() -> Optional[int]:
+    """Target DPI for scanned pages from DOCAI_UPLOAD_DPI; None (the default) disables re-encoding."""
+    value = os.getenv("DOCAI_UPLOAD_DPI", "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    if value in ("true", "yes", "on"):
+        return DEFAULT_UPLOAD_DPI
+    return int(value)
+
+
+def preprocess_for_upload(pdf_bytes: bytes) -> bytes:
+    """Applies the optional scan re-encoding before a PDF is sent to Document AI."""
+    dpi = get_upload_dpi()
+    if dpi is None:
+        return pdf_bytes
+    quality = int(os.getenv("DOCAI_UPLOAD_JPEG_QUALITY", DEFAULT_JPEG_QUALITY))
+    return downsample_scanned_pages(pdf_bytes, dpi, quality)
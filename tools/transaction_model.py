@@ -0,0 +1,53 @@
+# tools/transaction_model.py
+
+import logging
+from datetime import date
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class Transaction:
+    """
+    One transaction row with canonical fields, independent of the bank's
+    header names.
+
+    Dates are stored as ordinals and money as signed integer cents (negative =
+    money out), so rows are small and aggregation is plain integer math.
+    Records are built table by table in tools/normalization.py.
+    """
+
+    __slots__ = ("date", "amount_cents", "description", "balance_cents", "page", "row")
+
+    def __init__(self, date: Optional[int], amount_cents: Optional[int], description: str,
+                 balance_cents: Optional[int] = None, page: int = 0, row: int = 0):
+        self.date = date
+        self.amount_cents = amount_cents
+        self.description = description
+        self.balance_cents = balance_cents
+        self.page = page
+        self.row = row
+
+    def __repr__(self) -> str:
+        return (f"Transaction(date={self.date_iso}, amount_cents={self.amount_cents}, "
+                f"description={self.description!r}, balance_cents={self.balance_cents}, page={self.page}, row={self.row})")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Transaction):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    @property
+    def date_iso(self) -> Optional[str]:
+        return date.fromordinal(self.date).isoformat() if self.date else None
+
+    def to_dict(self) -> Dict[str, object]:
+        """JSON-friendly view: ISO date and decimal amounts."""
+        return {
+            "date": self.date_iso,
+            "description": self.description,
+            "amount": self.amount_cents / 100 if self.amount_cents is not None else None,
+            "balance": self.balance_cents / 100 if self.balance_cents is not None else None,
+            "page": self.page,
+            "row": self.row,
+        }
+